@@ -1,8 +1,11 @@
-from flask import Flask, request, jsonify
-from main import run_pipeline
+from flask import Flask, request, jsonify, Response, stream_with_context
+from main import run_pipeline, iter_pipeline_stages, compose_pipeline_output, answer_image_query
+from modules.audio_feedback import synthesize, audio_mimetype
 from PIL import Image
 import io
+import json
 import os
+import time
 
 print("✅ App is starting...")   # Add this
 
@@ -23,6 +26,85 @@ def analyze_image():
     output = run_pipeline(image_path=temp_path, save_output=False, speak_enabled=False)
     return jsonify(output)
 
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/analyze/stream', methods=['POST'])
+def analyze_image_stream():
+    """Server-sent events: one event per stage as it finishes, then a final event"""
+    if 'image' not in request.files:
+        return jsonify({'error': 'No image uploaded'}), 400
+
+    image = Image.open(io.BytesIO(request.files['image'].read())).convert('RGB')
+
+    def generate():
+        start = time.perf_counter()
+        results = {}
+        timings = {}
+        errors = {}
+        try:
+            for stage, result, timing in iter_pipeline_stages(image, return_exceptions=True):
+                timings[stage] = timing
+                if isinstance(result, Exception):
+                    # A failed stage is reported; the others still stream in
+                    print(f"❌ Stage {stage} failed: {result!r}")
+                    errors[stage] = f"{type(result).__name__}: {result}"
+                    yield sse_event("error", {"stage": stage, "error": errors[stage], "timing": timing})
+                    continue
+                results[stage] = result
+                yield sse_event(stage, {"result": result, "timing": timing})
+
+            if not errors:
+                output = compose_pipeline_output(results["caption"], results["detection"], results["ocr"],
+                                                 image.size)
+        except Exception as e:
+            print(f"❌ Pipeline failed: {e!r}")
+            errors["pipeline"] = f"{type(e).__name__}: {e}"
+            yield sse_event("error", {"stage": None, "error": errors["pipeline"]})
+
+        if errors:
+            # Whatever did complete, so the client isn't left with nothing
+            output = {"completed": results, "errors": errors}
+        output["stage_timings"] = timings
+        output["total_seconds"] = round(time.perf_counter() - start, 3)
+        yield sse_event("final", output)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+@app.route('/query', methods=['POST'])
+def query_image():
+    """Answer a question about an uploaded image (repeated questions come from the answer cache)"""
+    if 'image' not in request.files:
+        return jsonify({'error': 'No image uploaded'}), 400
+    question = (request.form.get('question') or '').strip()
+    if not question:
+        return jsonify({'error': 'No question provided'}), 400
+
+    image = Image.open(io.BytesIO(request.files['image'].read())).convert('RGB')
+    answer = answer_image_query(image, question, speak_enabled=False)
+    return jsonify({'question': question, 'answer': answer})
+
+@app.route('/tts', methods=['POST'])
+def text_to_speech():
+    data = request.get_json(silent=True) or request.form
+    text = (data.get('text') or '').strip()
+    if not text:
+        return jsonify({'error': 'No text provided'}), 400
+
+    # Optional engine overrides; each combination is cached separately
+    settings = {}
+    if data.get('rate'):
+        settings['rate'] = int(data['rate'])
+    if data.get('volume'):
+        settings['volume'] = float(data['volume'])
+
+    audio = synthesize(text, **settings)
+    return Response(audio, mimetype=audio_mimetype(audio))
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     print(f"✅ Running on 0.0.0.0:{port}")    # Add this
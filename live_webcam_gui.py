@@ -1,88 +1,187 @@
 import cv2
 from PIL import Image, ImageTk
 import tkinter as tk
-from ultralytics import YOLO
+import argparse
 import threading
 import time
-import pyttsx3  # 👈 New import
+from modules.audio_feedback import get_speech_service
+from modules.camera_capture import CameraStream, parse_camera_source
+from modules.stage_scheduler import get_scheduler
+from modules.motion_gate import MotionGate, AdaptiveRateLimiter
+from modules.scene_narrator import SceneNarrator
+from modules.object_detection import get_yolo
 
 # Load YOLO model
-yolo_model = YOLO("yolov8n.pt")
+yolo_model = get_yolo()
+
+
+def update_rate(current, interval):
+    """Exponential moving average of a rate, from the interval since the last event"""
+    if interval <= 0:
+        return current
+    instant = 1.0 / interval
+    return instant if current == 0 else 0.9 * current + 0.1 * instant
+
 
 class LiveObjectDetector:
-    def __init__(self, root):
+    def __init__(self, root, camera_source=0, motion_threshold=0.02, target_utilization=0.5,
+                 captions=True, caption_interval=10.0):
         self.root = root
         self.root.title("🎥 Live Object Detection with Voice")
 
         self.label = tk.Label(root)
         self.label.pack()
 
-        self.cap = cv2.VideoCapture(0)
+        # Capture, inference and rendering each run on their own thread:
+        # camera grabber -> inference worker (newest frame only) -> Tk render loop
+        self.camera = CameraStream(camera_source).start()
+        self.last_frame_index = None
         self.running = True
-        self.last_objects = []
 
-        # TTS engine
-        self.tts_engine = pyttsx3.init()
-        self.tts_engine.setProperty('rate', 150)
-
-        # Start narration thread
-        self.narration_thread = threading.Thread(target=self.narrate_loop, daemon=True)
-        self.narration_thread.start()
+        # Static scenes reuse the previous detections; inference is paced
+        # so YOLO only takes the target share of CPU time
+        self.motion_gate = MotionGate(threshold=motion_threshold)
+        self.rate_limiter = AdaptiveRateLimiter(target_utilization=target_utilization)
+        self.frames_checked = 0
+        self.frames_skipped = 0
+
+        # Latest inference results, shared between the inference thread and the UI
+        self.lock = threading.Lock()
+        self.detections = []
+        self.display_fps = 0.0
+        self.inference_fps = 0.0
+        self.last_render_time = None
+
+        # Shared speech service (one TTS engine for the whole app)
+        self.speech = get_speech_service()
+        self.speech.set_property('rate', 150)
+
+        # Start inference thread
+        self.inference_thread = threading.Thread(target=self.inference_loop, daemon=True)
+        self.inference_thread.start()
+
+        # Narration thread: speaks only debounced scene changes
+        self.narrator = SceneNarrator(self.speech).start()
+
+        # Slow BLIP scene captions, merged into the same narration stream
+        self.captioner = None
+        if captions:
+            from modules.live_captioning import LiveCaptioner
+            self.captioner = LiveCaptioner(self.camera, self.narrator, min_interval=caption_interval).start()
 
         self.update_frame()
 
     def detect_objects(self, frame):
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = yolo_model.predict(rgb, verbose=False)[0]
+        results = yolo_model.predict(frame, verbose=False)[0]
         names = results.names
 
-        current_objects = []
+        detections = []
         for box in results.boxes:
             cls_id = int(box.cls.item())
-            label = names[cls_id]
-            conf = float(box.conf[0])
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-
-            current_objects.append(label)
-
+            detections.append({
+                "label": names[cls_id],
+                "bbox": [int(v) for v in box.xyxy[0].tolist()],
+                "confidence": float(box.conf[0]),
+            })
+        return detections
+
+    def inference_loop(self):
+        last_inferred = None
+        last_done = None
+        while self.running:
+            # Always the newest frame; frames grabbed during inference are skipped
+            grabbed = self.camera.read(newer_than=last_inferred, timeout=0.5)
+            if grabbed is None:
+                continue
+            last_inferred = grabbed.index
+
+            # Unchanged scene: keep showing the previous detections
+            self.frames_checked += 1
+            if not self.motion_gate.check(grabbed.image, grabbed.timestamp):
+                self.frames_skipped += 1
+                continue
+
+            start = time.monotonic()
+            detections = get_scheduler().run("detection", self.detect_objects, grabbed.image)
+            self.rate_limiter.record(time.monotonic() - start)
+
+            now = time.monotonic()
+            with self.lock:
+                self.detections = detections
+                if last_done is not None:
+                    self.inference_fps = update_rate(self.inference_fps, now - last_done)
+            last_done = now
+            self.narrator.update(detections, grabbed.image.shape[1])
+
+            # Back off according to the measured model latency
+            time.sleep(self.rate_limiter.interval)
+
+    def draw_overlay(self, frame, detections, display_fps, inference_fps, skipped_ratio):
+        for d in detections:
+            x1, y1, x2, y2 = d["bbox"]
             cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            cv2.putText(frame, f"{label} ({conf:.2f})", (x1, y1 - 10),
+            cv2.putText(frame, f"{d['label']} ({d['confidence']:.2f})", (x1, y1 - 10),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
 
-        self.last_objects = list(set(current_objects))  # 👈 Save for narration
+        cv2.putText(frame, f"Display {display_fps:.1f} FPS | Inference {inference_fps:.1f} FPS",
+                    (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+        cv2.putText(frame, f"Static frames skipped: {skipped_ratio:.0%}",
+                    (10, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
         return frame
 
-    def narrate_loop(self):
-        while self.running:
-            if self.last_objects:
-                objects_str = ", ".join(self.last_objects)
-                speech = f"I see {objects_str}."
-                self.tts_engine.say(speech)
-                self.tts_engine.runAndWait()
-            time.sleep(5)  # 👈 Narrate every 5 seconds
-
     def update_frame(self):
         if not self.running:
             return
-        ret, frame = self.cap.read()
-        if ret:
-            frame = self.detect_objects(frame)
+        grabbed = self.camera.read(newer_than=self.last_frame_index, timeout=0)
+        if grabbed is not None:
+            self.last_frame_index = grabbed.index
+
+            now = time.monotonic()
+            if self.last_render_time is not None:
+                self.display_fps = update_rate(self.display_fps, now - self.last_render_time)
+            self.last_render_time = now
+
+            with self.lock:
+                detections = self.detections
+                inference_fps = self.inference_fps
+
+            # Draw the most recent boxes on a copy; the camera buffer keeps the original frame
+            skipped_ratio = self.frames_skipped / max(self.frames_checked, 1)
+            frame = self.draw_overlay(grabbed.image.copy(), detections, self.display_fps,
+                                      inference_fps, skipped_ratio)
             cv_img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             img = Image.fromarray(cv_img)
             imgtk = ImageTk.PhotoImage(image=img)
 
             self.label.imgtk = imgtk
             self.label.configure(image=imgtk)
-        self.root.after(10, self.update_frame)
+        self.root.after(5, self.update_frame)
 
     def stop(self):
         self.running = False
-        self.cap.release()
+        if self.captioner is not None:
+            self.captioner.stop()
+        self.narrator.stop()
+        self.speech.stop()
+        self.camera.stop()
         self.root.destroy()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Live object detection with voice")
+    parser.add_argument("--camera", type=str, default="0", help="Camera index or video file")
+    parser.add_argument("--motion-threshold", type=float, default=0.02,
+                        help="Fraction of changed pixels that triggers new detections")
+    parser.add_argument("--target-cpu", type=float, default=0.5,
+                        help="Share of time (0-1] the detector may keep its worker busy")
+    parser.add_argument("--no-captions", action="store_true", help="Disable background scene captions")
+    parser.add_argument("--caption-interval", type=float, default=10.0,
+                        help="Minimum seconds between scene captions")
+    args = parser.parse_args()
+
     root = tk.Tk()
-    app = LiveObjectDetector(root)
+    app = LiveObjectDetector(root, parse_camera_source(args.camera),
+                             args.motion_threshold, args.target_cpu,
+                             captions=not args.no_captions, caption_interval=args.caption_interval)
     root.protocol("WM_DELETE_WINDOW", app.stop)
     root.mainloop()
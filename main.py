@@ -5,7 +5,9 @@ from PIL import Image
 import requests
 from transformers import Blip2Processor, Blip2ForConditionalGeneration
 from collections import Counter
+from concurrent.futures import as_completed
 import argparse
+import time
 
 # Set matplotlib to non-GUI backend if running on Render
 if os.environ.get("RENDER", "0") == "1":
@@ -19,33 +21,27 @@ sys.path.append(os.path.abspath("."))
 in_jupyter = 'ipykernel' in sys.modules
 
 # Import modules
-from modules.ocr_reader import read_text_combined
+from modules.ocr_reader import read_text_lines
 from modules.vlm_captioning import describe_scene
-from modules.object_detection import detect_objects
-from modules.audio_feedback import speak
-from modules.camera_capture import capture_image
-from modules.vqa_module import VQAProcessor  # New VQA module
+from modules.object_detection import detect_objects, known_labels
+from modules.audio_feedback import speak, wait_until_done
+from modules.camera_capture import capture_image, parse_camera_source
+from modules.image_io import load_image, image_size, describe_source
+from modules.vqa_module import VQAProcessor, classify_query, answer_from_detections, text_answer  # New VQA module
 from modules.video_captioning import VideoCaptioningProcessor  # New video captioning module
+from modules.video_index import VideoIndex
+from modules.stage_scheduler import get_scheduler
 
 
-def run_pipeline(image_path=None, save_output=False, output_path="output.txt", speak_enabled=True):
-    if image_path is None:
-        image_path = capture_image(use_gui=True)
-
-    print("🔍 Analyzing:", image_path)
-
-    # Run modules
-    scene = describe_scene(image_path)
-    detections = detect_objects(image_path)
-    text = read_text_combined(image_path)
+def summarize_detections(detections, image_size):
+    """Count detections and phrase them by object, region and relationship"""
+    W, H = image_size
 
     # Count objects
     labels = [d["label"] for d in detections]
     counts = Counter(labels)
 
     # Determine spatial regions
-    img = Image.open(image_path)
-    W, H = img.size
     region_dets = {"left": [], "center": [], "right": []}
     for d in detections:
         x1, y1, x2, y2 = d.get("bbox", [0, 0, 0, 0])
@@ -80,58 +76,179 @@ def run_pipeline(image_path=None, save_output=False, output_path="output.txt", s
                     rel_phrases.append(f"a person on a {v['label']} on the {reg}")
                     break
 
+    return {
+        "counts": counts,
+        "obj_phrases": obj_phrases,
+        "region_phrases": region_phrases,
+        "rel_phrases": rel_phrases,
+    }
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def iter_pipeline_stages(image_path, return_exceptions=False):
+    """
+    Run the caption, detection and OCR stages concurrently and yield
+    (stage, result, timing) in the order the stages finish
+
+    timing holds the stage's own run time ("seconds") and how long after
+    the start of the pipeline its result became available ("ready_after").
+    With return_exceptions, a failed stage yields its exception as the
+    result and the other stages still come through; otherwise it raises.
+    """
+    scheduler = get_scheduler()
+    start = time.perf_counter()
+    futures = {
+        scheduler.submit("caption", _timed, describe_scene, image_path): "caption",
+        scheduler.submit("detection", _timed, detect_objects, image_path): "detection",
+        scheduler.submit("ocr", _timed, read_text_lines, image_path): "ocr",
+    }
+    for future in as_completed(futures):
+        error = future.exception()
+        if error is not None and not return_exceptions:
+            raise error
+        result, seconds = (error, None) if error is not None else future.result()
+        timing = {
+            "seconds": None if seconds is None else round(seconds, 3),
+            "ready_after": round(time.perf_counter() - start, 3),
+        }
+        yield futures[future], result, timing
+
+
+def narrate_stage(stage, result, image_size):
+    """Short sentence for one finished stage, or None if there is nothing new to say"""
+    if stage == "detection":
+        summary = summarize_detections(result, image_size)
+        if not summary["obj_phrases"]:
+            return "I don't see any familiar objects."
+        rel_part = ' '.join([f"There is {rp}." for rp in summary["rel_phrases"]])
+        return (
+            f"I see {', '.join(summary['obj_phrases'])}. "
+            f"Specifically, {', '.join(summary['region_phrases'])}. {rel_part}"
+        ).strip()
+    if stage == "caption":
+        return f"The image shows {result}."
+    if stage == "ocr" and result["text"]:
+        return f"The text says: {result['text']}."
+    return None
+
+
+def compose_pipeline_output(scene, detections, ocr, image_size):
+    """Combine the stage results into the pipeline's result dict"""
+    text = ocr["text"] or "No readable text found."
+
+    summary = summarize_detections(detections, image_size)
+    rel_phrases = summary["rel_phrases"]
+
     # Final output construction
     rel_part = ''
     if rel_phrases:
         rel_part = ' '.join([f"There is {rp}." for rp in rel_phrases]) + ' '
     final_output = (
         f"{rel_part}The image shows {scene}. "
-        f"I see {', '.join(obj_phrases)}. "
-        f"Specifically, {', '.join(region_phrases)}."
+        f"I see {', '.join(summary['obj_phrases'])}. "
+        f"Specifically, {', '.join(summary['region_phrases'])}."
     )
 
+    return {
+        "scene_description": scene,
+        "objects_detected": dict(summary["counts"]),
+        "regions": summary["region_phrases"],
+        "relationships": rel_phrases,
+        "ocr_text": text,
+        "ocr_lines": ocr["lines"],
+        "ocr_gate": ocr["text_gate"],
+        "detections": detections,
+        "full_generated_output": final_output
+    }
+
+
+def run_pipeline(image_path=None, save_output=False, output_path="output.txt", speak_enabled=True, progressive=False):
+    if image_path is None:
+        # Camera frames stay in memory; no round trip through a JPEG on disk
+        image_path = capture_image(save_path=None, use_gui=True)
+        if image_path is None:
+            return None
+
+    print("🔍 Analyzing:", describe_source(image_path))
+
+    size = image_size(image_path)
+
+    # Run modules concurrently; in progressive mode each result is spoken
+    # as soon as its stage finishes instead of waiting for the slowest one
+    results = {}
+    timings = {}
+    for stage, result, timing in iter_pipeline_stages(image_path):
+        results[stage] = result
+        timings[stage] = timing
+        if progressive and speak_enabled:
+            narration = narrate_stage(stage, result, size)
+            if narration:
+                speak(narration)
+
+    output = compose_pipeline_output(results["caption"], results["detection"], results["ocr"], size)
+    output["stage_timings"] = timings
+    final_output = output["full_generated_output"]
+
     print("\n🔊 Final Output:\n", final_output)
 
-    if speak_enabled:
+    # Progressive mode has already spoken every part
+    if speak_enabled and not progressive:
         speak(final_output)
 
     if save_output:
+        obj_phrases = [f"{cnt} {lbl}{'s' if cnt>1 else ''}" for lbl, cnt in output["objects_detected"].items()]
         with open(output_path, "w", encoding="utf-8") as f:
-            f.write(f"Image Path: {image_path}\nScene: {scene}\n")
+            f.write(f"Image Path: {describe_source(image_path)}\nScene: {output['scene_description']}\n")
             f.write(f"Objects: {', '.join(obj_phrases)}\n")
-            if region_phrases:
-                f.write(f"Regions: {', '.join(region_phrases)}\n")
-            if rel_phrases:
-                f.write(f"Relations: {', '.join(rel_phrases)}\n")
-            f.write(f"Text: {text}\n")
+            if output["regions"]:
+                f.write(f"Regions: {', '.join(output['regions'])}\n")
+            if output["relationships"]:
+                f.write(f"Relations: {', '.join(output['relationships'])}\n")
+            f.write(f"Text: {output['ocr_text']}\n")
         print(f"💾 Output saved to {output_path}")
 
-    return {
-        "scene_description": scene,
-        "objects_detected": dict(counts),
-        "regions": region_phrases,
-        "relationships": rel_phrases,
-        "ocr_text": text,
-        "full_generated_output": final_output
-    }
+    return output
 
 
 # Enhanced version with query support and video captioning
 def answer_image_query(image_path, query, speak_enabled=True):
-    """Process a natural language query about an image"""
-    # Initialize VQA processor if not already initialized
+    """
+    Process a natural language query about an image
+
+    The question is routed to the cheapest stage that can answer it:
+    counts and locations come from the detector, text questions from OCR,
+    and only open-ended questions run the VQA model.
+    """
     global vqa_processor
-    if 'vqa_processor' not in globals():
-        vqa_processor = VQAProcessor()
-    
-    # First run standard pipeline to get image data
-    image_data = run_pipeline(image_path, save_output=False, speak_enabled=False)
-    
-    # Now answer the specific query
-    answer = vqa_processor.answer_query_with_context(image_path, query, image_data)
+    scheduler = get_scheduler()
+    start = time.perf_counter()
+    
+    intent = classify_query(query)
+    answer = None
+    if intent in ("count", "location"):
+        detections = scheduler.run("detection", detect_objects, image_path)
+        answer = answer_from_detections(query, detections, image_size(image_path)[0], known_labels())
+    elif intent == "text":
+        # The user asked for text, so skip the text-presence gate
+        ocr = scheduler.run("ocr", read_text_lines, image_path, False)
+        answer = text_answer(ocr["text"])
+    
+    if answer is None:
+        # Open-ended question (or one the detector can't answer): VQA only
+        intent = "open"
+        if 'vqa_processor' not in globals():
+            vqa_processor = VQAProcessor()
+        answer = scheduler.run(
+            "vqa", vqa_processor.answer_question, image_path, vqa_processor.parse_and_enhance_query(query)
+        )
     
     print(f"\n❓ Query: {query}")
-    print(f"💬 Answer: {answer}")
+    print(f"💬 Answer: {answer}  ({intent}, {time.perf_counter() - start:.2f}s)")
     
     if speak_enabled:
         speak(answer)
@@ -139,7 +256,8 @@ def answer_image_query(image_path, query, speak_enabled=True):
     return answer
 
 
-def caption_video(video_path=None, duration=10, camera_id=0, speak_enabled=True):
+def caption_video(video_path=None, duration=10, camera_id=0, speak_enabled=True, workers=1, show_preview=True,
+                  index=False, budget=None):
     """Record or use an existing video and generate a caption"""
     # Initialize video captioning processor if not already initialized
     global video_processor
@@ -148,9 +266,10 @@ def caption_video(video_path=None, duration=10, camera_id=0, speak_enabled=True)
     
     # Either use provided video or record a new one
     if video_path is None:
-        video_path, caption = video_processor.record_and_caption_video(duration, camera_id)
+        video_path, caption = video_processor.record_and_caption_video(duration, camera_id,
+                                                                       show_preview=show_preview)
     else:
-        caption, _ = video_processor.caption_video(video_path)
+        caption, _ = video_processor.caption_video(video_path, workers=workers, index=index, budget=budget)
     
     print(f"\n🎬 Video: {video_path}")
     print(f"📝 Caption: {caption}")
@@ -161,6 +280,44 @@ def caption_video(video_path=None, duration=10, camera_id=0, speak_enabled=True)
     return caption
 
 
+def stream_video_captions(source, window=10.0, loop=False, summary_windows=0, speak_enabled=True):
+    """Caption a long video, camera or stream window by window as it plays"""
+    global video_processor
+    if 'video_processor' not in globals():
+        video_processor = VideoCaptioningProcessor()
+    
+    for result in video_processor.stream_captions(source, window=window, loop=loop,
+                                                   summary_windows=summary_windows):
+        print(f"\n⏱️ {result['start']:.0f}s-{result['end']:.0f}s: {result['caption']}")
+        if result["summary"]:
+            print(f"🧾 Recent: {result['summary']}")
+        if speak_enabled:
+            # A newer window replaces a caption that hasn't been spoken yet
+            speak(result["caption"], key="video-window")
+
+
+def search_video(video_path, label=None, text=None):
+    """Answer 'when does X appear' / 'where is text X' from a video's index, without any model"""
+    video_index = VideoIndex.load(video_path)
+    if video_index is None:
+        print(f"❌ No up-to-date index for {video_path}; run it with --video {video_path} --index first")
+        return None
+    
+    if label:
+        spans = video_index.when(label)
+        if spans:
+            print(f"\n🔎 {label}: " + ", ".join(f"{start:.1f}s-{end:.1f}s" for start, end in spans))
+        else:
+            print(f"\n🔎 No {label} found in {video_path}")
+        return spans
+    
+    matches = video_index.frames_with_text(text)
+    print(f"\n🔎 {len(matches)} frames contain '{text}'")
+    for match in matches:
+        print(f"   {match['timestamp']:.1f}s: {match['text']}")
+    return matches
+
+
 # GUI part: only imports GUI libraries inside function
 def launch_gui():
     import tkinter as tk
@@ -174,7 +331,7 @@ def launch_gui():
     current_video_path = None
     
     def draw_boxes_on_image(image_path, detections):
-        img = Image.open(image_path).convert("RGB")
+        img = load_image(image_path)
         # Scale down large images for display
         max_width = 800
         if img.width > max_width:
@@ -184,68 +341,15 @@ def launch_gui():
             img = img.resize((new_width, new_height))
         return ImageTk.PhotoImage(img)
 
-    def process_image(image_path, output_text_widget, image_label, speak_enabled=True):
+    def process_image(image_path, output_text_widget, image_label, speak_enabled=True, progressive=False):
         try:
-            scene = describe_scene(image_path)
-            detections = detect_objects(image_path)
-
-            if detections and isinstance(detections[0], str):
-                detections = [{"label": lbl, "bbox": [0,0,0,0]} for lbl in detections]
-
-            text = read_text_combined(image_path)
-
-            labels = [d["label"] for d in detections]
-            counts = Counter(labels)
-            img = Image.open(image_path)
-            W, H = img.size
-            region_dets = {"left": [], "center": [], "right": []}
-            for d in detections:
-                x1, y1, x2, y2 = d.get("bbox", [0,0,0,0])
-                cx = (x1 + x2) / 2
-                if cx < W/3:
-                    region = "left"
-                elif cx > 2*W/3:
-                    region = "right"
-                else:
-                    region = "center"
-                region_dets[region].append(d)
-
-            obj_phrases = [f"{cnt} {lbl}{'s' if cnt>1 else ''}" for lbl, cnt in counts.items()]
-            region_phrases = []
-            for reg, dets in region_dets.items():
-                ctr = Counter([d["label"] for d in dets])
-                for lbl, cnt in ctr.items():
-                    region_phrases.append(f"{cnt} {lbl}{'s' if cnt>1 else ''} on the {reg}")
-
-            rel_phrases = []
-            for reg, dets in region_dets.items():
-                persons = [d for d in dets if d["label"] == "person"]
-                vehicles = [d for d in dets if d["label"] in ("motorcycle", "bicycle", "motorbike", "bike")]
-                for p in persons:
-                    px1, py1, px2, py2 = p.get("bbox", [0,0,0,0])
-                    pcx, pcy = (px1+px2)/2, (py1+py2)/2
-                    for v in vehicles:
-                        vx1, vy1, vx2, vy2 = v.get("bbox", [0,0,0,0])
-                        if vx1 <= pcx <= vx2 and vy1 <= pcy <= vy2:
-                            rel_phrases.append(f"a person on a {v['label']} on the {reg}")
-                            break
-
-            rel_part = ''
-            if rel_phrases:
-                rel_part = ' '.join([f"There is {rp}." for rp in rel_phrases]) + ' '
-
-            final_output = (
-                f"{rel_part}The image shows {scene}. "
-                f"I see {', '.join(obj_phrases)}. "
-                f"Specifically, {', '.join(region_phrases)}."
-            )
+            result = run_pipeline(image_path, speak_enabled=speak_enabled, progressive=progressive)
+            detections = result["detections"]
+            final_output = result["full_generated_output"]
 
             output_text_widget.delete(1.0, tk.END)
             output_text_widget.insert(tk.END, final_output)
 
-            if speak_enabled:
-                speak(final_output)
-
             img_tk = draw_boxes_on_image(image_path, detections)
             image_label.configure(image=img_tk)
             image_label.image = img_tk
@@ -265,7 +369,7 @@ def launch_gui():
             return
             
         nonlocal current_image_path
-        if not current_image_path:
+        if current_image_path is None:
             messagebox.showinfo("No Image", "Please load an image first.")
             return
             
@@ -278,7 +382,7 @@ def launch_gui():
         except Exception as e:
             messagebox.showerror("Error", str(e))
     
-    def process_video(video_path, output_text, video_duration_var, camera_id_var, speak_var):
+    def process_video(video_path, output_text, video_duration_var, camera_id_var, speak_var, budget_var):
         """Process a video file or record from camera"""
         try:
             nonlocal current_video_path
@@ -286,10 +390,13 @@ def launch_gui():
             # If no path provided, record from camera
             if not video_path:
                 duration = int(video_duration_var.get())
-                camera_id = int(camera_id_var.get())
-                caption = caption_video(None, duration, camera_id, speak_var.get())
+                camera_id = parse_camera_source(camera_id_var.get())
+                # Headless: the recording runs off the Tk thread, where OpenCV windows misbehave
+                caption = caption_video(None, duration, camera_id, speak_var.get(), show_preview=False)
             else:
-                caption = caption_video(video_path, speak_enabled=speak_var.get())
+                # An empty budget keeps the default fixed number of frames
+                budget = float(budget_var.get()) if budget_var.get().strip() else None
+                caption = caption_video(video_path, speak_enabled=speak_var.get(), budget=budget)
                 current_video_path = video_path
             
             output_text.delete(1.0, tk.END)
@@ -306,18 +413,18 @@ def launch_gui():
             # Start processing in a separate thread to keep UI responsive
             threading.Thread(
                 target=process_image, 
-                args=(file_path, output_text, image_display, speech_var.get()),
+                args=(file_path, output_text, image_display, speech_var.get(), progressive_var.get()),
                 daemon=True
             ).start()
     
     def capture_from_camera():
         try:
-            # Capture image using the camera module
-            img_path = capture_image(use_gui=False)
-            if img_path:
+            # Capture a frame straight into memory using the camera module
+            frame = capture_image(save_path=None, camera_index=parse_camera_source(camera_id_var.get()), use_gui=False)
+            if frame is not None:
                 threading.Thread(
                     target=process_image, 
-                    args=(img_path, output_text, image_display, speech_var.get()),
+                    args=(frame, output_text, image_display, speech_var.get(), progressive_var.get()),
                     daemon=True
                 ).start()
         except Exception as e:
@@ -330,14 +437,14 @@ def launch_gui():
         if file_path:
             threading.Thread(
                 target=process_video,
-                args=(file_path, output_text, video_duration_var, camera_id_var, speech_var),
+                args=(file_path, output_text, video_duration_var, camera_id_var, speech_var, budget_var),
                 daemon=True
             ).start()
     
     def record_video():
         threading.Thread(
             target=process_video,
-            args=(None, output_text, video_duration_var, camera_id_var, speech_var),
+            args=(None, output_text, video_duration_var, camera_id_var, speech_var, budget_var),
             daemon=True
         ).start()
     
@@ -416,6 +523,11 @@ def launch_gui():
     speech_check = ttk.Checkbutton(controls_frame, text="Enable Speech", variable=speech_var)
     speech_check.pack(side=tk.LEFT, padx=5)
     
+    # Speak each stage's result as soon as it is ready
+    progressive_var = tk.BooleanVar(value=False)
+    progressive_check = ttk.Checkbutton(controls_frame, text="Progressive Narration", variable=progressive_var)
+    progressive_check.pack(side=tk.LEFT, padx=5)
+    
     # Save results button
     save_button = ttk.Button(controls_frame, text="Save Results", command=save_results)
     save_button.pack(side=tk.RIGHT, padx=5)
@@ -452,6 +564,10 @@ def launch_gui():
     camera_id_var = tk.StringVar(value="0")
     ttk.Entry(video_settings, textvariable=camera_id_var, width=5).grid(row=0, column=3, padx=5, pady=5, sticky="w")
     
+    ttk.Label(video_settings, text="Time budget (s):").grid(row=0, column=4, padx=5, pady=5, sticky="w")
+    budget_var = tk.StringVar(value="")
+    ttk.Entry(video_settings, textvariable=budget_var, width=5).grid(row=0, column=5, padx=5, pady=5, sticky="w")
+    
     # === QUERY TAB CONTROLS ===
     query_controls = ttk.Frame(query_tab)
     query_controls.pack(fill=tk.X, padx=10, pady=10)
@@ -485,7 +601,7 @@ if __name__ == "__main__":
     # Check if we're running in Jupyter
     if in_jupyter:
         # For Jupyter, provide a direct function call instead of using argparse
-        def run_in_jupyter(mode='gui', image_path=None, video_path=None, query=None, save_output=False, output_file="output.txt", speak_enabled=True):
+        def run_in_jupyter(mode='gui', image_path=None, video_path=None, query=None, save_output=False, output_file="output.txt", speak_enabled=True, progressive=False):
             """
             Run the Vision Assistant in Jupyter notebook
             
@@ -508,11 +624,13 @@ if __name__ == "__main__":
                 Path to save the output (if save_output is True)
             speak_enabled : bool
                 Whether to enable speech output
+            progressive : bool
+                Speak each stage's result as soon as it finishes ('image' mode)
             """
             if mode == 'gui':
                 launch_gui()
             elif mode == 'image' and image_path:
-                run_pipeline(image_path, save_output, output_file, speak_enabled)
+                run_pipeline(image_path, save_output, output_file, speak_enabled, progressive)
             elif mode == 'video':
                 caption_video(video_path, speak_enabled=speak_enabled)
             elif mode == 'query' and image_path and query:
@@ -544,6 +662,21 @@ if __name__ == "__main__":
             parser.add_argument("--gui", action="store_true", help="Launch GUI")
             parser.add_argument("--record", type=int, default=0, help="Record video for N seconds")
             parser.add_argument("--query", type=str, help="Ask a question about the image")
+            parser.add_argument("--progressive", action="store_true", help="Speak each result as soon as it is ready")
+            parser.add_argument("--index", action="store_true",
+                                help="Keep a searchable per-frame index next to the --video file")
+            parser.add_argument("--find", type=str, help="When does this object appear in the indexed --video")
+            parser.add_argument("--find-text", type=str, help="Frames of the indexed --video containing this text")
+            parser.add_argument("--headless", action="store_true", help="Record without a preview window")
+            parser.add_argument("--budget", type=float,
+                                help="Seconds --video captioning may take; frames are chosen to fit")
+            parser.add_argument("--workers", type=int, default=1,
+                                help="Worker processes for --video (0 picks one per 4 cores)")
+            parser.add_argument("--stream", type=str, help="Caption a video file, camera index or stream URL window by window")
+            parser.add_argument("--window", type=float, default=10.0, help="Window length in seconds for --stream")
+            parser.add_argument("--loop", action="store_true", help="Replay a --stream video file like a live stream")
+            parser.add_argument("--summary-windows", type=int, default=0,
+                                help="Also print a rolling summary of the last N windows")
             
             args = parser.parse_args()
             
@@ -554,12 +687,20 @@ if __name__ == "__main__":
                 # Command-line mode
                 speak_enabled = not args.no_speak
                 
-                if args.video:
+                if args.stream:
+                    # Caption a long video or live source window by window
+                    stream_video_captions(parse_camera_source(args.stream), args.window, args.loop,
+                                          args.summary_windows, speak_enabled=speak_enabled)
+                elif args.video and (args.find or args.find_text):
+                    # Search an analyzed video without running any model
+                    search_video(args.video, args.find, args.find_text)
+                elif args.video:
                     # Process video
-                    caption_video(args.video, speak_enabled=speak_enabled)
+                    caption_video(args.video, speak_enabled=speak_enabled, workers=args.workers or None,
+                                  index=args.index, budget=args.budget)
                 elif args.record > 0:
                     # Record and process video
-                    caption_video(None, args.record, speak_enabled=speak_enabled)
+                    caption_video(None, args.record, speak_enabled=speak_enabled, show_preview=not args.headless)
                 elif args.image:
                     # Process image
                     if args.query:
@@ -567,15 +708,20 @@ if __name__ == "__main__":
                         answer_image_query(args.image, args.query, speak_enabled=speak_enabled)
                     else:
                         # Basic image analysis
-                        run_pipeline(args.image, args.save, args.output, speak_enabled=speak_enabled)
+                        run_pipeline(args.image, args.save, args.output, speak_enabled=speak_enabled,
+                                     progressive=args.progressive)
                 else:
                     # No image or video specified, show help
                     parser.print_help()
+
+                # Speech runs in the background; let it finish before exiting
+                wait_until_done()
         except SystemExit:
             # Catch SystemExit to avoid problems in environments that don't handle it well
             pass
 
 
 
-# Run the GUI directly
-run_in_jupyter('gui')
+# Run the GUI directly (in a notebook; worker processes re-import this file)
+if __name__ == "__main__" and in_jupyter:
+    run_in_jupyter('gui')
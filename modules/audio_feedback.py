@@ -1,8 +1,346 @@
+import heapq
+import itertools
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
 import pyttsx3
 
-engine = pyttsx3.init()
+# Utterance priorities: lower values are spoken first
+PRIORITY_URGENT = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 10
+
+# Upper bound for the synthesized audio cache
+CACHE_MAX_BYTES = int(float(os.environ.get("VISION_TTS_CACHE_MB", 32)) * 1024 * 1024)
+
+
+class AudioCache:
+    """LRU cache of rendered speech, bounded by total size in bytes"""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            audio = self._items.get(key)
+            if audio is not None:
+                self._items.move_to_end(key)
+            return audio
+
+    def put(self, key, audio):
+        if len(audio) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self._size -= len(self._items.pop(key))
+            self._items[key] = audio
+            self._size += len(audio)
+            while self._size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+
+
+def audio_mimetype(audio):
+    """Guess the container of rendered speech (pyttsx3 writes WAV, or AIFF on macOS)"""
+    if audio[:4] == b"FORM":
+        return "audio/aiff"
+    return "audio/wav"
+
+
+def _find_player():
+    if sys.platform == "win32":
+        return "winsound"
+    for player in ("afplay", "paplay", "aplay"):
+        if shutil.which(player):
+            return player
+    return None
+
+
+class _Utterance:
+    def __init__(self, text, priority, key, max_age, settings, kind="speak"):
+        self.text = text
+        self.priority = priority
+        self.key = key
+        self.deadline = time.monotonic() + max_age if max_age else None
+        # Engine properties at the time of the request (part of the cache key)
+        self.settings = settings
+        # "speak" plays the text, "render" only returns the audio bytes
+        self.kind = kind
+        # Completion handle: resolves to True when spoken, False if interrupted,
+        # cancelled if dropped before playback (await it with asyncio.wrap_future).
+        # Render jobs resolve to the audio bytes instead.
+        self.future = Future()
+
+    @property
+    def cache_key(self):
+        return (self.text,) + tuple(sorted(self.settings.items()))
+
+
+class SpeechService:
+    def __init__(self, rate=None, volume=None, cache_max_bytes=CACHE_MAX_BYTES):
+        """
+        Single text-to-speech service with a dedicated worker thread
+
+        The pyttsx3 engine lives entirely on the worker thread; callers only
+        enqueue utterances and never block on speech. Text is rendered to an
+        audio buffer once and played from the cache afterwards, so repeated
+        phrases cost only playback.
+
+        Args:
+            rate (int): Speech rate in words per minute (engine default if None)
+            volume (float): Volume between 0 and 1 (engine default if None)
+            cache_max_bytes (int): Size limit of the rendered audio cache
+        """
+        self.cache = AudioCache(cache_max_bytes)
+        self._player = _find_player()
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._current = None
+        self._stop_current = False
+        self._properties = {}
+        if rate is not None:
+            self._properties["rate"] = rate
+        if volume is not None:
+            self._properties["volume"] = volume
+
+        self._worker = threading.Thread(target=self._run, name="speech", daemon=True)
+        self._worker.start()
+
+    def speak(self, text, priority=PRIORITY_NORMAL, key=None, interrupt=False, max_age=None):
+        """
+        Queue text for speech and return immediately
+
+        Args:
+            text (str): Text to speak
+            priority (int): Lower values are spoken first
+            key (str): Queued utterances with the same key are superseded by this one
+            interrupt (bool): Stop the current utterance and drop queued ones of
+                equal or lower priority
+            max_age (float): Drop the utterance if it hasn't started within this many seconds
+
+        Returns:
+            concurrent.futures.Future: Completion handle for the utterance
+        """
+        with self._cond:
+            utterance = _Utterance(text, priority, key, max_age, dict(self._properties))
+            if interrupt:
+                self._drop(lambda u: u.priority >= priority)
+                current = self._current
+                if current is not None and current.kind == "speak" and current.priority >= priority:
+                    self._stop_current = True
+            elif key is not None:
+                self._drop(lambda u: u.key == key)
+
+            heapq.heappush(self._heap, (priority, next(self._counter), utterance))
+            self._cond.notify_all()
+        return utterance.future
+
+    def synthesize(self, text, priority=PRIORITY_NORMAL, **settings):
+        """
+        Render text to audio bytes without playing it
+
+        Args:
+            text (str): Text to render
+            priority (int): Queue priority of the render job
+            **settings: Engine property overrides (e.g. rate=150)
+
+        Returns:
+            concurrent.futures.Future: Resolves to WAV (or AIFF on macOS) bytes
+        """
+        with self._cond:
+            merged = dict(self._properties)
+            merged.update(settings)
+            utterance = _Utterance(text, priority, None, None, merged, kind="render")
+
+            audio = self.cache.get(utterance.cache_key)
+            if audio is not None:
+                utterance.future.set_result(audio)
+                return utterance.future
+
+            heapq.heappush(self._heap, (priority, next(self._counter), utterance))
+            self._cond.notify_all()
+        return utterance.future
 
-def speak(text):
+    def set_property(self, name, value):
+        """Set a pyttsx3 engine property (e.g. 'rate', 'volume', 'voice')"""
+        with self._cond:
+            self._properties[name] = value
+
+    def stop(self):
+        """Stop the current utterance and drop everything queued"""
+        with self._cond:
+            self._drop(lambda u: True)
+            if self._current is not None and self._current.kind == "speak":
+                self._stop_current = True
+
+    def wait_until_done(self, timeout=None):
+        """
+        Block until the queue is empty and nothing is being spoken
+
+        Returns:
+            bool: False if the timeout expired first
+        """
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not self._heap and self._current is None, timeout
+            )
+
+    def _drop(self, predicate):
+        # Caller holds self._cond
+        kept = []
+        for entry in self._heap:
+            # Render jobs belong to other callers (e.g. HTTP clients) and are never dropped
+            if entry[2].kind == "speak" and predicate(entry[2]):
+                entry[2].future.cancel()
+            else:
+                kept.append(entry)
+        heapq.heapify(kept)
+        self._heap = kept
+
+    def _on_word(self, name, location, length):
+        # Runs on the worker thread inside runAndWait, where stop() is safe
+        if self._stop_current:
+            self._engine.stop()
+
+    def _apply_settings(self, settings):
+        for name, value in settings.items():
+            if self._applied.get(name) != value:
+                self._engine.setProperty(name, value)
+                self._applied[name] = value
+
+    def _render(self, utterance):
+        """Render an utterance to audio bytes, going through the cache"""
+        audio = self.cache.get(utterance.cache_key)
+        if audio is not None:
+            return audio
+
+        self._apply_settings(utterance.settings)
+        fd, path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        try:
+            self._engine.save_to_file(utterance.text, path)
+            self._engine.runAndWait()
+            with open(path, "rb") as f:
+                audio = f.read()
+        finally:
+            os.remove(path)
+
+        # An interrupted render is truncated; don't keep it
+        if not self._stop_current:
+            self.cache.put(utterance.cache_key, audio)
+        return audio
+
+    def _play(self, audio):
+        """Play rendered audio; returns False if it was interrupted"""
+        if self._player == "winsound":
+            import winsound
+            winsound.PlaySound(audio, winsound.SND_MEMORY)
+            return True
+
+        suffix = ".aiff" if audio_mimetype(audio) == "audio/aiff" else ".wav"
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, "wb") as f:
+            f.write(audio)
+        try:
+            command = [self._player, "-q", path] if self._player == "aplay" else [self._player, path]
+            process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            while process.poll() is None:
+                if self._stop_current:
+                    process.terminate()
+                    process.wait()
+                    return False
+                time.sleep(0.02)
+            return True
+        finally:
+            os.remove(path)
+
+    def _speak_direct(self, utterance):
+        # No audio player available: let the engine speak through its own driver
+        self._apply_settings(utterance.settings)
+        self._engine.say(utterance.text)
+        self._engine.runAndWait()
+        return not self._stop_current
+
+    def _run(self):
+        try:
+            self._engine = pyttsx3.init()
+            self._engine.connect("started-word", self._on_word)
+        except Exception as e:
+            print(f"❌ Speech engine unavailable: {e}")
+            self._engine = None
+        self._applied = {}
+
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._heap)
+                _, _, utterance = heapq.heappop(self._heap)
+                stale = utterance.deadline is not None and time.monotonic() > utterance.deadline
+                if stale or not utterance.future.set_running_or_notify_cancel():
+                    if stale:
+                        utterance.future.cancel()
+                    self._cond.notify_all()
+                    continue
+                self._current = utterance
+                self._stop_current = False
+
+            try:
+                if self._engine is None:
+                    raise RuntimeError("No text-to-speech engine available")
+
+                if utterance.kind == "render":
+                    utterance.future.set_result(self._render(utterance))
+                elif self._player is None:
+                    utterance.future.set_result(self._speak_direct(utterance))
+                else:
+                    audio = self._render(utterance)
+                    completed = not self._stop_current and self._play(audio)
+                    utterance.future.set_result(completed)
+            except Exception as e:
+                utterance.future.set_exception(e)
+
+            with self._cond:
+                self._current = None
+                self._cond.notify_all()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_speech_service():
+    """Return the process-wide speech service, starting it on first use"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = SpeechService()
+        return _service
+
+
+def speak(text, priority=PRIORITY_NORMAL, key=None, interrupt=False, max_age=None):
     print("\n🔊 Speaking...")
-    engine.say(text)
-    engine.runAndWait()
+    return get_speech_service().speak(
+        text, priority=priority, key=key, interrupt=interrupt, max_age=max_age
+    )
+
+
+def synthesize(text, **settings):
+    """Render text to audio bytes (blocking), served from the cache when possible"""
+    return get_speech_service().synthesize(text, **settings).result()
+
+
+def wait_until_done(timeout=None):
+    """Wait for all queued speech to finish (call before a script exits)"""
+    if _service is None:
+        return True
+    return _service.wait_until_done(timeout)
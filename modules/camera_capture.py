@@ -1,39 +1,184 @@
 import cv2
-import matplotlib.pyplot as plt
+import threading
+import time
+from collections import deque, namedtuple
+
+# A grabbed frame: BGR image, capture time (time.monotonic) and running frame number
+Frame = namedtuple("Frame", ["image", "timestamp", "index"])
+
+# Frames skipped before an automatic capture so exposure can settle
+WARMUP_FRAMES = 5
+
+
+def parse_camera_source(value):
+    """Camera index for numeric strings, otherwise a video file path or stream URL"""
+    value = str(value).strip()
+    return int(value) if value.isdigit() else value
+
+
+class CameraStream:
+    def __init__(self, source=0, buffer_size=4, loop=True, realtime=True):
+        """
+        Grab frames on a background thread into a small ring buffer
+
+        Consumers always get the newest frame (latest-frame-wins); older
+        frames are overwritten instead of queuing up behind slow readers.
+
+        Args:
+            source (int|str): Camera index, or a video file / stream URL used
+                as a stand-in device
+            buffer_size (int): Number of recent frames kept in memory
+            loop (bool): Restart a video file when it ends
+            realtime (bool): Pace a video file at its native FPS like a camera
+        """
+        self.source = source
+        self.is_file = isinstance(source, str) and "://" not in source
+        self.loop = loop
+        self.realtime = realtime
+
+        self.cap = cv2.VideoCapture(source)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Could not open camera source: {source}")
+        self.source_fps = self.cap.get(cv2.CAP_PROP_FPS) or 0.0
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+        self.frames = deque(maxlen=buffer_size)
+        self.fps = 0.0
+        self.finished = False
+        self._index = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if not self._running:
+            self._running = True
+            self._thread = threading.Thread(target=self._grab_loop, name="camera", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        self.cap.release()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _grab_loop(self):
+        frame_interval = 1.0 / self.source_fps if self.is_file and self.realtime and self.source_fps > 0 else 0
+        next_due = time.monotonic()
+        last_time = None
+
+        while self._running:
+            ret, image = self.cap.read()
+            if not ret:
+                if self.is_file and self.loop:
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                break
+
+            if frame_interval:
+                next_due += frame_interval
+                delay = next_due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_due = time.monotonic()
+
+            now = time.monotonic()
+            if last_time is not None and now > last_time:
+                # Exponential moving average of the measured frame rate
+                instant = 1.0 / (now - last_time)
+                self.fps = instant if self.fps == 0 else 0.9 * self.fps + 0.1 * instant
+            last_time = now
+
+            with self._cond:
+                self.frames.append(Frame(image, now, self._index))
+                self._index += 1
+                self._cond.notify_all()
+
+        with self._cond:
+            self.finished = True
+            self._cond.notify_all()
+
+    def read(self, newer_than=None, timeout=2.0):
+        """
+        Return the newest frame
+
+        Args:
+            newer_than (int): Wait for a frame with a higher index than this
+                (use the index of the last frame you processed)
+            timeout (float): Seconds to wait for a suitable frame
+
+        Returns:
+            Frame: (image, timestamp, index), or None if no new frame arrived
+        """
+        def ready():
+            if self.finished:
+                return True
+            if not self.frames:
+                return False
+            return newer_than is None or self.frames[-1].index > newer_than
+
+        with self._cond:
+            self._cond.wait_for(ready, timeout)
+            if not self.frames:
+                return None
+            frame = self.frames[-1]
+            if newer_than is not None and frame.index <= newer_than:
+                return None
+            return frame
+
 
 def capture_image(save_path='captured.jpg', camera_index=0, use_gui=True):
-    cap = cv2.VideoCapture(camera_index)
-    
-    # Start capturing
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("Failed to grab frame.")
-            break
-        
+    """
+    Capture a single frame from the camera
+
+    With use_gui, shows a live preview; press 'c' to capture or 'q' to cancel.
+
+    Returns:
+        str or numpy.ndarray: save_path after writing the frame, or the BGR
+        frame itself when save_path is None (None if nothing was captured)
+    """
+    captured = None
+    with CameraStream(camera_index) as camera:
         if use_gui:
-            # Convert BGR to RGB for display in matplotlib
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-            # Use matplotlib to display image inline
-            plt.imshow(frame_rgb)
-            plt.axis('off')  # Hide axes
-            plt.show()
-
-            key = cv2.waitKey(1)
-            if key == ord('c'):  # Press 'c' to capture
-                cv2.imwrite(save_path, frame)
-                print(f"Image captured and saved as {save_path}")
-                break
-            elif key == ord('q'):  # Press 'q' to quit
-                print("Capture cancelled.")
-                break
+            last_index = None
+            while True:
+                frame = camera.read(newer_than=last_index)
+                if frame is None:
+                    print("Failed to grab frame.")
+                    break
+                last_index = frame.index
 
+                cv2.imshow("Camera - press 'c' to capture, 'q' to quit", frame.image)
+                key = cv2.waitKey(1) & 0xFF
+                if key == ord('c'):  # Press 'c' to capture
+                    captured = frame.image
+                    break
+                elif key == ord('q'):  # Press 'q' to quit
+                    print("Capture cancelled.")
+                    break
+            cv2.destroyAllWindows()
         else:
             # Automatically capture without GUI
-            cv2.imwrite(save_path, frame)
-            break
+            frame = camera.read(newer_than=WARMUP_FRAMES - 1)
+            if frame is None:
+                print("Failed to grab frame.")
+            else:
+                captured = frame.image
 
-    cap.release()
+    if captured is None:
+        return None
+    if save_path is None:
+        return captured
 
+    cv2.imwrite(save_path, captured)
+    print(f"Image captured and saved as {save_path}")
     return save_path
@@ -0,0 +1,61 @@
+import cv2
+import numpy as np
+
+
+def downscale_gray(frame, size=(64, 48)):
+    """
+    Tiny grayscale thumbnail of a BGR frame for cheap frame-to-frame comparisons
+
+    Args:
+        frame (numpy.ndarray): BGR (or already grayscale) frame
+        size (tuple): Thumbnail (width, height)
+
+    Returns:
+        numpy.ndarray: float32 thumbnail with values in 0..255
+    """
+    if frame.ndim == 3:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    # Light blur so sensor noise doesn't register as change
+    return cv2.GaussianBlur(small, (3, 3), 0).astype(np.float32)
+
+
+def color_histogram(frame, bins=(8, 8, 4), size=(64, 48)):
+    """
+    Normalized HSV color histogram of a downscaled BGR frame
+
+    Returns:
+        numpy.ndarray: Flat float32 histogram summing to 1
+    """
+    small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+    hist = cv2.calcHist([hsv], [0, 1, 2], None, list(bins), [0, 180, 0, 256, 0, 256])
+    hist = hist.ravel()
+    return hist / max(hist.sum(), 1e-6)
+
+
+def histogram_distance(a, b):
+    """Hellinger distance between two normalized histograms (0 = identical, 1 = disjoint)"""
+    bc = np.sum(np.sqrt(a * b), axis=-1)
+    return np.sqrt(np.clip(1.0 - bc, 0.0, 1.0))
+
+
+def dhash(frame, hash_size=8):
+    """
+    Difference hash: one bit per horizontal brightness gradient of a tiny thumbnail
+
+    Robust to scaling, compression and small exposure changes, so
+    near-identical frames hash to (almost) the same bits.
+
+    Returns:
+        numpy.ndarray: hash_size * hash_size bits packed into uint8
+    """
+    if frame.ndim == 3:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(frame, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    return np.packbits(small[:, 1:] > small[:, :-1])
+
+
+def hamming_distance(a, b):
+    """Number of differing bits between packed hashes (broadcasts over leading axes)"""
+    return np.unpackbits(np.bitwise_xor(a, b), axis=-1).sum(axis=-1)
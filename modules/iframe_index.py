@@ -0,0 +1,144 @@
+import numpy as np
+
+try:
+    import av
+except ImportError:
+    av = None
+
+from modules.frame_signatures import color_histogram, dhash
+from modules.keyframes import select_keyframes
+
+# Most I-frames decoded (at thumbnail size) to choose from
+IFRAME_BUDGET = 240
+# Size I-frame candidates are scored at
+SIGNATURE_MAX_SIDE = 160
+# Containers whose seek index can be walked instead of reading every packet
+INDEXED_FORMATS = {"mov", "mp4", "matroska", "webm"}
+
+
+def _open(video_path):
+    if av is None:
+        raise ImportError("The 'iframe' method needs PyAV: pip install av")
+    container = av.open(video_path)
+    return container, container.streams.video[0]
+
+
+def _seek_keyframes(container, stream):
+    """
+    Keyframe pts found by seeking from one keyframe to the next
+
+    A forward seek lands on the first keyframe at or after the target
+    using the container's index, so only one packet per keyframe is read.
+
+    Returns:
+        list: pts of every keyframe, or None if the seeks don't behave
+    """
+    keyframes = []
+    target = stream.start_time or 0
+    while True:
+        try:
+            container.seek(target, stream=stream, backward=False, any_frame=False)
+        except av.error.FFmpegError:
+            break  # Past the last keyframe
+        packet = next((p for p in container.demux(stream) if p.size), None)
+        if packet is None:
+            break
+        if not packet.is_keyframe or packet.pts is None or (keyframes and packet.pts <= keyframes[-1]):
+            return None
+        keyframes.append(packet.pts)
+        target = packet.pts + 1
+    return keyframes
+
+
+def _scan_keyframes(container, stream):
+    """Keyframe pts from demuxing every packet (reads the whole file)"""
+    return [p.pts for p in container.demux(stream) if p.is_keyframe and p.pts is not None]
+
+
+def keyframe_index(video_path):
+    """
+    Timestamps of all I-frames, found without decoding
+
+    In containers with a seek index (MP4/MOV's stss table, Matroska's
+    cues) the index is walked with forward seeks, reading one packet per
+    keyframe. Other containers (AVI, raw streams) are demuxed packet by
+    packet, which reads the whole file but still decodes nothing.
+
+    Returns:
+        list: (pts, seconds) per keyframe, in stream order
+    """
+    container, stream = _open(video_path)
+    try:
+        pts = None
+        if INDEXED_FORMATS & set(container.format.name.split(",")):
+            pts = _seek_keyframes(container, stream)
+            if pts is None:
+                container.seek(0, stream=stream)
+        if pts is None:
+            pts = _scan_keyframes(container, stream)
+    finally:
+        container.close()
+    return [(p, float(p * stream.time_base)) for p in sorted(set(pts))]
+
+
+def _decode_at(container, stream, pts, max_side=None):
+    """Seek to a keyframe and decode just that frame as a BGR array"""
+    container.seek(pts, stream=stream, backward=True, any_frame=False)
+    for frame in container.decode(stream):
+        scale = max_side / max(frame.width, frame.height) if max_side else 1
+        if scale < 1:
+            # Let the decoder's scaler shrink the frame during color conversion
+            width = max(2, round(frame.width * scale))
+            height = max(2, round(frame.height * scale))
+            return frame.to_ndarray(format="bgr24", width=width, height=height)
+        return frame.to_ndarray(format="bgr24")
+    return None
+
+
+def iter_iframes(video_path, n_frames=5, max_side=None, keyframes=None):
+    """
+    Pick representative frames among the I-frames only
+
+    The I-frame positions come from keyframe_index. An evenly spaced
+    budget of them is decoded at thumbnail size and scored like the
+    'keyframe' method, and the winners are decoded again at full size.
+    Each decode is a seek straight to an I-frame, so no other frame is
+    ever decoded.
+
+    Args:
+        keyframes (list): Result of keyframe_index, if the caller already has it
+
+    Yields:
+        tuple: (frame_index, timestamp in seconds, BGR frame)
+    """
+    if keyframes is None:
+        keyframes = keyframe_index(video_path)
+    if not keyframes:
+        return
+
+    if len(keyframes) > IFRAME_BUDGET:
+        keep = np.linspace(0, len(keyframes) - 1, IFRAME_BUDGET).round().astype(int)
+        keyframes = [keyframes[i] for i in keep]
+
+    container, stream = _open(video_path)
+    try:
+        fps = float(stream.average_rate or 0)
+        if len(keyframes) > n_frames:
+            candidates, histograms, hashes = [], [], []
+            for keyframe in keyframes:
+                thumbnail = _decode_at(container, stream, keyframe[0], SIGNATURE_MAX_SIDE)
+                if thumbnail is not None:
+                    candidates.append(keyframe)
+                    histograms.append(color_histogram(thumbnail))
+                    hashes.append(dhash(thumbnail))
+            if not candidates:
+                return
+            chosen = select_keyframes(np.array(histograms), np.array(hashes), n_frames)
+            keyframes = [candidates[i] for i in chosen]
+
+        for pts, seconds in keyframes:
+            image = _decode_at(container, stream, pts, max_side)
+            if image is not None:
+                yield int(round(seconds * fps)), seconds, image
+    finally:
+        container.close()
@@ -0,0 +1,38 @@
+from PIL import Image
+import numpy as np
+
+
+def load_image(source):
+    """
+    Load an image as RGB PIL image from any of the inputs the pipeline accepts
+
+    Args:
+        source (str|PIL.Image|numpy.ndarray): File path, PIL image, or an
+            in-memory OpenCV frame (BGR, as returned by CameraStream)
+
+    Returns:
+        PIL.Image: RGB image
+    """
+    if isinstance(source, Image.Image):
+        return source.convert("RGB")
+    if isinstance(source, np.ndarray):
+        if source.ndim == 2:
+            return Image.fromarray(source).convert("RGB")
+        # OpenCV frames are BGR
+        return Image.fromarray(np.ascontiguousarray(source[:, :, 2::-1]))
+    return Image.open(source).convert("RGB")
+
+
+def image_size(source):
+    """(width, height) of a path, PIL image or numpy frame"""
+    if isinstance(source, np.ndarray):
+        return source.shape[1], source.shape[0]
+    if isinstance(source, Image.Image):
+        return source.size
+    with Image.open(source) as img:
+        return img.size
+
+
+def describe_source(source):
+    """Short printable name for an image input"""
+    return source if isinstance(source, str) else f"in-memory {type(source).__name__}"
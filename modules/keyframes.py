@@ -0,0 +1,95 @@
+import numpy as np
+
+from modules.frame_signatures import histogram_distance, hamming_distance
+
+# A cut must stand this many robust deviations above the typical frame-to-frame change
+BOUNDARY_SENSITIVITY = 3.0
+# ... and never below this combined distance, so static videos don't split on noise
+MIN_BOUNDARY_DISTANCE = 0.15
+
+
+def frame_distances(histograms, hashes):
+    """
+    Change between consecutive frames from their signatures
+
+    Args:
+        histograms (numpy.ndarray): (N, bins) normalized color histograms
+        hashes (numpy.ndarray): (N, bytes) packed perceptual hashes
+
+    Returns:
+        numpy.ndarray: (N - 1,) distances in 0..1, the mean of the color
+        and structure changes
+    """
+    color = histogram_distance(histograms[1:], histograms[:-1])
+    structure = hamming_distance(hashes[1:], hashes[:-1]) / (hashes.shape[1] * 8)
+    return (color + structure) / 2
+
+
+def shot_boundaries(distances, sensitivity=BOUNDARY_SENSITIVITY, min_distance=MIN_BOUNDARY_DISTANCE):
+    """
+    Indices of the first frame of every shot after the first
+
+    The threshold adapts to the video: median change plus a multiple of
+    the median absolute deviation, so handheld or noisy footage needs a
+    larger jump to count as a cut than a tripod shot.
+    """
+    if len(distances) == 0:
+        return np.array([], dtype=int)
+    median = np.median(distances)
+    spread = 1.4826 * np.median(np.abs(distances - median))
+    threshold = max(median + sensitivity * spread, min_distance)
+    return np.flatnonzero(distances > threshold) + 1
+
+
+def _representative(histograms, start, stop):
+    """Frame in [start, stop) closest to the segment's mean color distribution"""
+    mean = histograms[start:stop].mean(axis=0)
+    return start + int(np.argmin(histogram_distance(histograms[start:stop], mean)))
+
+
+def select_keyframes(histograms, hashes, n_frames, **boundary_options):
+    """
+    Pick the n_frames most representative frames across a whole video
+
+    Frames are split into shots at detected cuts. With more shots than
+    requested frames the longest shots win; otherwise frames are shared
+    out in proportion to shot length and every shot is split evenly
+    among its frames. Each part is represented by its most typical frame.
+
+    Args:
+        histograms (numpy.ndarray): (N, bins) color histograms of the candidates
+        hashes (numpy.ndarray): (N, bytes) perceptual hashes of the candidates
+        n_frames (int): Number of frames to select
+        **boundary_options: Passed to shot_boundaries
+
+    Returns:
+        list: Sorted candidate indices
+    """
+    total = len(histograms)
+    if total == 0 or n_frames <= 0:
+        return []
+    if total <= n_frames:
+        return list(range(total))
+
+    cuts = shot_boundaries(frame_distances(histograms, hashes), **boundary_options)
+    starts = np.concatenate([[0], cuts])
+    stops = np.concatenate([cuts, [total]])
+    lengths = stops - starts
+
+    if len(starts) >= n_frames:
+        # Longest shots first; ties keep their order in the video
+        chosen = np.argsort(-lengths, kind="stable")[:n_frames]
+        return sorted(_representative(histograms, starts[i], stops[i]) for i in chosen)
+
+    # One frame per shot, the rest by largest remainder of each shot's share
+    share = lengths / total * (n_frames - len(starts))
+    counts = 1 + np.floor(share).astype(int)
+    for i in np.argsort(-(share - np.floor(share)), kind="stable")[:n_frames - counts.sum()]:
+        counts[i] += 1
+    counts = np.minimum(counts, lengths)
+
+    selected = []
+    for start, stop, count in zip(starts, stops, counts):
+        edges = np.linspace(start, stop, count + 1).round().astype(int)
+        selected.extend(_representative(histograms, a, b) for a, b in zip(edges[:-1], edges[1:]))
+    return sorted(selected)
@@ -0,0 +1,72 @@
+import threading
+import time
+
+from modules.vlm_captioning import describe_scene
+from modules.frame_signatures import color_histogram, histogram_distance
+from modules.motion_gate import AdaptiveRateLimiter
+from modules.stage_scheduler import get_scheduler
+
+
+class LiveCaptioner:
+    def __init__(self, camera, narrator, min_interval=10.0, change_threshold=0.3, target_utilization=0.2):
+        """
+        Low-rate BLIP captioning next to the high-rate live detector
+
+        A background worker captions the newest camera frame at most every
+        min_interval seconds, and only when the scene's color histogram has
+        moved far enough from the last captioned frame.
+
+        Args:
+            camera (CameraStream): Frame source
+            narrator (SceneNarrator): Receives new captions for the narration stream
+            min_interval (float): Shortest time between two captions in seconds
+            change_threshold (float): Histogram distance (0-1) that counts as a new scene
+            target_utilization (float): Share of time the caption stage may be busy
+        """
+        self.camera = camera
+        self.narrator = narrator
+        self.min_interval = min_interval
+        self.change_threshold = change_threshold
+        self.rate_limiter = AdaptiveRateLimiter(target_utilization=target_utilization, max_interval=60.0)
+        self.last_caption = None
+        self._last_signature = None
+        self._running = False
+
+    def start(self):
+        if not self._running:
+            self._running = True
+            threading.Thread(target=self._run, name="live-captioner", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._running = False
+
+    def _run(self):
+        next_allowed = 0.0
+        while self._running:
+            now = time.monotonic()
+            if now < next_allowed:
+                time.sleep(min(next_allowed - now, 0.5))
+                continue
+
+            frame = self.camera.read(timeout=0.5)
+            if frame is None:
+                continue
+
+            # Only caption when the scene has substantially changed
+            signature = color_histogram(frame.image)
+            if self._last_signature is not None:
+                if histogram_distance(signature, self._last_signature) < self.change_threshold:
+                    time.sleep(0.5)
+                    continue
+
+            start = time.monotonic()
+            caption = get_scheduler().run("caption", describe_scene, frame.image)
+            latency = time.monotonic() - start
+            self.rate_limiter.record(latency)
+
+            self._last_signature = signature
+            self.last_caption = caption
+            self.narrator.add_caption(caption)
+
+            next_allowed = time.monotonic() + max(self.min_interval - latency, self.rate_limiter.interval)
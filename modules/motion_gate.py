@@ -0,0 +1,71 @@
+import time
+
+import numpy as np
+
+from modules.frame_signatures import downscale_gray
+
+
+class MotionGate:
+    def __init__(self, threshold=0.02, pixel_delta=12, max_age=3.0):
+        """
+        Decide whether a frame differs enough from the last analyzed one to need new detections
+
+        Args:
+            threshold (float): Fraction of thumbnail pixels that must change
+            pixel_delta (int): Per-pixel intensity change that counts as changed
+            max_age (float): Force a refresh after this many seconds even in a static scene
+        """
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.max_age = max_age
+        self._reference = None
+        self._reference_time = None
+        self.last_change = 0.0
+
+    def check(self, frame, timestamp=None):
+        """
+        Compare a frame against the reference; a frame that passes becomes the new reference
+
+        Returns:
+            bool: True if detections should be recomputed for this frame
+        """
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        thumb = downscale_gray(frame)
+        # Remove the mean so auto-exposure drift isn't mistaken for motion
+        thumb -= thumb.mean()
+
+        if self._reference is None or timestamp - self._reference_time > self.max_age:
+            self.last_change = 1.0
+        else:
+            diff = np.abs(thumb - self._reference)
+            self.last_change = float(np.count_nonzero(diff > self.pixel_delta)) / diff.size
+            if self.last_change < self.threshold:
+                return False
+
+        self._reference = thumb
+        self._reference_time = timestamp
+        return True
+
+
+class AdaptiveRateLimiter:
+    def __init__(self, target_utilization=0.5, max_interval=2.0):
+        """
+        Pace inference so the model occupies roughly a target share of one worker's time
+
+        Args:
+            target_utilization (float): Desired busy fraction (0-1] of the inference worker
+            max_interval (float): Longest pause between inferences in seconds
+        """
+        self.target_utilization = min(max(target_utilization, 0.01), 1.0)
+        self.max_interval = max_interval
+        self.latency = 0.0
+
+    def record(self, latency):
+        """Feed the measured latency of one inference"""
+        self.latency = latency if self.latency == 0 else 0.8 * self.latency + 0.2 * latency
+
+    @property
+    def interval(self):
+        """Idle time after each inference: busy / (busy + idle) == target utilization"""
+        idle = self.latency * (1.0 / self.target_utilization - 1.0)
+        return min(idle, self.max_interval)
@@ -1,9 +1,58 @@
-from ultralytics import YOLO
+import threading
 
-yolo_model = YOLO("yolov8n.pt")
+import numpy as np
+from ultralytics import YOLO, __version__ as ultralytics_version
+
+from modules.shared_weights import load_shared
+
+YOLO_WEIGHTS = "yolov8n.pt"
+# Architecture and class names of YOLO_WEIGHTS, to build it without reading the weights
+YOLO_CONFIG = "yolov8n.yaml"
+YOLO_DATASET = "coco.yaml"
+
+# Loaded on first use, so importing this module (e.g. in a worker process) costs no model memory
+_yolo_model = None
+_yolo_lock = threading.Lock()
+
+def _prepare_yolo(model):
+    """
+    Fuse the model and set up its predictor now, so the predictor's module is the one to share
+
+    The first predict deep-copies the model into the predictor and fuses
+    Conv and BatchNorm into new tensors there; weights shared before that
+    would be copied again. The YOLO object then uses the predictor's module
+    too, so only one set of (fused) weights exists.
+    """
+    model.fuse()
+    model.predict(np.zeros((64, 64, 3), dtype=np.uint8), verbose=False)
+    model.model = model.predictor.model.model
+    return model
+
+def _yolo_skeleton():
+    """The YOLO_WEIGHTS architecture with random weights, for attaching to shared ones"""
+    from ultralytics.utils import YAML
+    from ultralytics.utils.checks import check_yaml
+
+    model = YOLO(YOLO_CONFIG)
+    model.model.names = YAML.load(check_yaml(YOLO_DATASET))["names"]
+    return _prepare_yolo(model)
+
+def get_yolo():
+    """Return the YOLO detector, loading it on first use"""
+    global _yolo_model
+    with _yolo_lock:
+        if _yolo_model is None:
+            _yolo_model = load_shared("yolov8n", lambda: _prepare_yolo(YOLO(YOLO_WEIGHTS)),
+                                      _yolo_skeleton, module_of=lambda model: model.model,
+                                      fingerprint=f"ultralytics-{ultralytics_version}")
+        return _yolo_model
+
+def known_labels():
+    """Object classes the detector can find"""
+    return set(get_yolo().names.values())
 
 def detect_objects(image_path, conf_threshold=0.4):
-    results = yolo_model(image_path)[0]
+    results = get_yolo()(image_path)[0]
     names = results.names
 
     detections = []
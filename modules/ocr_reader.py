@@ -1,27 +1,262 @@
+import os
+import threading
 from transformers import TrOCRProcessor, VisionEncoderDecoderModel
-from PIL import Image
-import easyocr
+import numpy as np
+import cv2
+import torch
 
-# Load models once
-trocr_processor = TrOCRProcessor.from_pretrained("microsoft/trocr-base-printed")
-trocr_model = VisionEncoderDecoderModel.from_pretrained("microsoft/trocr-base-printed")
-reader = easyocr.Reader(['en'], gpu=False)
+from modules.image_io import load_image
+from modules.shared_weights import load_pretrained
+
+TROCR_MODEL_NAME = "microsoft/trocr-base-printed"
+
+# Models are loaded once, on first use: the text gate alone never needs them,
+# and importing this module (e.g. in a worker process) costs no model memory
+_trocr = None
+_reader = None
+_models_lock = threading.Lock()
+
+def get_trocr():
+    """Return the TrOCR processor and model, loading them on first use"""
+    global _trocr
+    with _models_lock:
+        if _trocr is None:
+            model = load_pretrained(VisionEncoderDecoderModel, TROCR_MODEL_NAME)
+            model.eval()
+            _trocr = (TrOCRProcessor.from_pretrained(TROCR_MODEL_NAME), model)
+        return _trocr
+
+def get_text_detector():
+    """Return the EasyOCR reader used for text line detection, loading it on first use"""
+    global _reader
+    with _models_lock:
+        if _reader is None:
+            import easyocr
+            _reader = easyocr.Reader(['en'], gpu=False)
+        return _reader
+
+# Extra padding (fraction of line height) around each detected line before recognition
+CROP_MARGIN = 0.15
+# Lines recognized with a lower mean token probability are dropped
+MIN_LINE_CONFIDENCE = 0.3
+# Most line crops recognized in one generate call (bounds memory on dense pages)
+OCR_BATCH_SIZE = 16
+
+# Text-presence gate: images are downscaled to this size before the edge check
+TEXT_GATE_MAX_SIDE = 640
+# Minimum text_presence_score for OCR to run. Calibrated on 21 text-free photos
+# (scikit-image, matplotlib and ultralytics samples): 17 score 0, the rest are
+# astronomy shots or contain digits. Every sample with legible text scores >= 1.
+TEXT_GATE_THRESHOLD = float(os.environ.get("VISION_TEXT_GATE_THRESHOLD", 1))
 
 def preprocess_image(image_path):
-    image = Image.open(image_path).convert("RGB")
+    image = load_image(image_path)
     return image
 
-def read_text_combined(image_path):
-    print("\n🔍 Performing OCR with TrOCR and EasyOCR...")
+def text_presence_score(image):
+    """
+    Cheap estimate of how much text an image contains
+
+    On a downscaled grayscale copy, strong local edges are binarized and
+    joined horizontally; words show up as dense, wide, short blobs. Natural
+    scenes produce such blobs too, but rarely in a row, so a blob only counts
+    when another blob of similar height sits next to it on the same line,
+    or when it is long enough to be a whole line on its own.
+
+    Args:
+        image (PIL.Image): RGB image
+
+    Returns:
+        int: Number of word/line-like regions that sit on a text line
+    """
+    gray = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2GRAY)
+    h, w = gray.shape
+    scale = TEXT_GATE_MAX_SIDE / max(h, w)
+    if scale < 1:
+        gray = cv2.resize(gray, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+    h, w = gray.shape
+
+    gradient = cv2.morphologyEx(
+        gray, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+    )
+    _, edges = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    joined = cv2.morphologyEx(
+        edges, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 1))
+    )
+
+    _, _, stats, _ = cv2.connectedComponentsWithStats(joined, connectivity=8)
+    x, y, bw, bh, area = stats[1:].T
+    box_area = np.maximum(bw * bh, 1)
+
+    # Edge density inside each blob's box, from an integral image
+    integral = cv2.integral(edges // 255)
+    edge_count = (integral[y + bh, x + bw] - integral[y, x + bw]
+                  - integral[y + bh, x] + integral[y, x])
+
+    text_like = (
+        (bh >= 5) & (bh <= h * 0.2)      # plausible line height
+        & (bw >= 1.5 * bh)               # words are wider than tall
+        & (area / box_area > 0.4)        # solid after joining
+        & (edge_count / box_area > 0.2)  # dense strokes
+    )
+    x, y, bw, bh = (v[text_like].astype(float) for v in (x, y, bw, bh))
+
+    # Pairwise: same line (centers and heights within 30%) and a word gap apart
+    center = y + bh / 2
+    gap = np.maximum(x[None, :] - (x + bw)[:, None], x[:, None] - (x + bw)[None, :])
+    same_line = (
+        (np.abs(center[None, :] - center[:, None]) < 0.3 * bh[:, None])
+        & (np.abs(bh[None, :] - bh[:, None]) < 0.3 * bh[:, None])
+        & (gap < 3 * bh[:, None])
+    )
+    np.fill_diagonal(same_line, False)
+    on_line = same_line.any(axis=1) | (bw >= 4.5 * bh)
+    return int(np.count_nonzero(on_line))
+
+def detect_text_boxes(image):
+    """
+    Find text line boxes with EasyOCR's detector (no recognition)
+
+    Args:
+        image (PIL.Image): RGB image
+
+    Returns:
+        list: Axis-aligned boxes as [x1, y1, x2, y2]
+    """
+    horizontal_list, free_list = get_text_detector().detect(np.array(image))
+    boxes = []
+    for x_min, x_max, y_min, y_max in horizontal_list[0]:
+        boxes.append([int(x_min), int(y_min), int(x_max), int(y_max)])
+    for polygon in free_list[0]:
+        xs = [p[0] for p in polygon]
+        ys = [p[1] for p in polygon]
+        boxes.append([int(min(xs)), int(min(ys)), int(max(xs)), int(max(ys))])
+    return boxes
+
+def sort_reading_order(boxes):
+    """
+    Order boxes top-to-bottom, then left-to-right within a line
 
+    Returns:
+        list: Indices into boxes in reading order
+    """
+    if not boxes:
+        return []
+
+    order = sorted(range(len(boxes)), key=lambda i: (boxes[i][1] + boxes[i][3]) / 2)
+    lines = []
+    for i in order:
+        x1, y1, x2, y2 = boxes[i]
+        cy = (y1 + y2) / 2
+        # Same line if the vertical centre falls inside the current line's band
+        if lines and abs(cy - lines[-1]["cy"]) < lines[-1]["height"] / 2:
+            lines[-1]["items"].append(i)
+        else:
+            lines.append({"cy": cy, "height": max(1, y2 - y1), "items": [i]})
+
+    return [i for line in lines for i in sorted(line["items"], key=lambda i: boxes[i][0])]
+
+def _recognize_batch(crops):
+    """(text, confidence) for a batch of line crops, from one generate call"""
+    trocr_processor, trocr_model = get_trocr()
+    pixel_values = trocr_processor(images=crops, return_tensors="pt").pixel_values
+    with torch.no_grad():
+        outputs = trocr_model.generate(
+            pixel_values,
+            output_scores=True,
+            return_dict_in_generate=True,
+        )
+
+    texts = trocr_processor.batch_decode(outputs.sequences, skip_special_tokens=True)
+
+    # Mean per-token probability as line confidence (padding tokens excluded)
+    transition_scores = trocr_model.compute_transition_scores(
+        outputs.sequences, outputs.scores,
+        beam_indices=getattr(outputs, "beam_indices", None),
+        normalize_logits=True,
+    )
+    generated = outputs.sequences[:, 1:]
+    mask = generated != trocr_processor.tokenizer.pad_token_id
+    probs = transition_scores.exp() * mask
+    confidences = (probs.sum(dim=1) / mask.sum(dim=1).clamp(min=1)).tolist()
+
+    return [(text.strip(), round(conf, 3)) for text, conf in zip(texts, confidences)]
+
+def recognize_lines(image, boxes, batch_size=OCR_BATCH_SIZE):
+    """
+    Recognize line crops with TrOCR, batch_size crops per generate call
+
+    Args:
+        image (PIL.Image): RGB image
+        boxes (list): Line boxes as [x1, y1, x2, y2]
+        batch_size (int): Most crops per generate call
+
+    Returns:
+        list: (text, confidence) per box
+    """
+    if not boxes:
+        return []
+
+    W, H = image.size
+    crops = []
+    for x1, y1, x2, y2 in boxes:
+        pad = int((y2 - y1) * CROP_MARGIN)
+        crops.append(image.crop((
+            max(0, x1 - pad), max(0, y1 - pad),
+            min(W, x2 + pad), min(H, y2 + pad),
+        )))
+
+    results = []
+    for start in range(0, len(crops), batch_size):
+        results.extend(_recognize_batch(crops[start:start + batch_size]))
+    return results
+
+def read_text_lines(image_path, use_gate=True):
+    """
+    Detect text lines once, then batch-recognize them with TrOCR
+
+    Args:
+        image_path (str|PIL.Image|numpy.ndarray): Image path or in-memory image
+        use_gate (bool): Skip OCR entirely when the text-presence check fails
+
+    Returns:
+        dict: {"text": full text in reading order,
+               "lines": [{"text", "bbox", "confidence", "order"}, ...],
+               "text_gate": {"text_likely", "score", "threshold"}}
+    """
     image = preprocess_image(image_path)
-    pixel_values = trocr_processor(images=image, return_tensors="pt").pixel_values
-    generated_ids = trocr_model.generate(pixel_values)
-    trocr_text = trocr_processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
 
-    result_easyocr = reader.readtext(image_path)
-    easy_text = [item[1] for item in result_easyocr if len(item[1]) > 1]
-    easyocr_combined = " ".join(easy_text)
+    gate = {"text_likely": True, "score": None, "threshold": TEXT_GATE_THRESHOLD}
+    if use_gate:
+        gate["score"] = text_presence_score(image)
+        gate["text_likely"] = gate["score"] >= TEXT_GATE_THRESHOLD
+        if not gate["text_likely"]:
+            print(f"\n⏭️ Skipping OCR: no text likely (score {gate['score']} < {TEXT_GATE_THRESHOLD:g})")
+            return {"text": "", "lines": [], "text_gate": gate}
+
+    print("\n🔍 Performing OCR (EasyOCR detection + batched TrOCR)...")
+
+    boxes = detect_text_boxes(image)
+    order = sort_reading_order(boxes)
+    ordered_boxes = [boxes[i] for i in order]
+    recognized = recognize_lines(image, ordered_boxes)
+
+    lines = []
+    for bbox, (text, confidence) in zip(ordered_boxes, recognized):
+        if len(text) > 1 and confidence >= MIN_LINE_CONFIDENCE:
+            lines.append({
+                "text": text,
+                "bbox": bbox,
+                "confidence": confidence,
+                "order": len(lines),
+            })
+
+    return {
+        "text": " ".join(line["text"] for line in lines),
+        "lines": lines,
+        "text_gate": gate,
+    }
 
-    final_text = trocr_text.strip() + ". " + easyocr_combined.strip()
-    return final_text if final_text.strip() else "No readable text found."
+def read_text_combined(image_path, use_gate=True):
+    result = read_text_lines(image_path, use_gate=use_gate)
+    return result["text"] if result["text"] else "No readable text found."
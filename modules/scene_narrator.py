@@ -0,0 +1,207 @@
+import threading
+import time
+from collections import Counter, deque
+
+from modules.audio_feedback import PRIORITY_URGENT, PRIORITY_NORMAL, PRIORITY_LOW
+
+# Objects whose arrival is announced right away
+HAZARD_LABELS = {"car", "bus", "truck", "motorcycle", "bicycle", "train"}
+
+# Captions sharing more than this fraction of words with the last one are not repeated
+CAPTION_OVERLAP = 0.6
+
+# Minimum seconds between two announcements of the same priority
+MIN_INTERVALS = {
+    PRIORITY_URGENT: 0.5,
+    PRIORITY_NORMAL: 2.0,
+    PRIORITY_LOW: 5.0,
+}
+
+
+def region_of(bbox, width):
+    cx = (bbox[0] + bbox[2]) / 2
+    if cx < width / 3:
+        return "left"
+    if cx > 2 * width / 3:
+        return "right"
+    return "center"
+
+
+def _phrase(label, count):
+    return f"{count} {label}{'s' if count > 1 else ''}"
+
+
+class SceneNarrator:
+    def __init__(self, speech, window=8, appear_ratio=0.6, disappear_ratio=0.2, min_confidence=0.4):
+        """
+        Speak only meaningful scene changes in live mode
+
+        The detection thread hands over observations with update(); a
+        narration thread smooths them over the last frames and announces
+        objects that appeared, disappeared, changed count or moved region.
+
+        Args:
+            speech (SpeechService): Service used for announcements
+            window (int): Number of recent observations to smooth over
+            appear_ratio (float): Share of recent frames an object needs to count as present
+            disappear_ratio (float): Share at or below which a present object counts as gone
+            min_confidence (float): Detections below this confidence are ignored
+        """
+        self.speech = speech
+        self.appear_ratio = appear_ratio
+        self.disappear_ratio = disappear_ratio
+        self.min_confidence = min_confidence
+
+        self._observations = deque(maxlen=window)
+        self._cond = threading.Condition()
+        self._version = 0
+        self._running = False
+
+        # Smoothed view of the scene and what the user has last been told
+        self._present = {}
+        self._spoken = {}
+        self._last_spoken_at = {}
+        self._pending = None
+        self._new_caption = None
+        self._spoken_caption = None
+
+    def update(self, detections, frame_width):
+        """Hand over the detections of one frame (called from the detection thread)"""
+        counts = Counter()
+        regions = {}
+        best = {}
+        for d in detections:
+            if d.get("confidence", 1.0) < self.min_confidence:
+                continue
+            label = d["label"]
+            counts[label] += 1
+            # The region of the most confident instance stands for the label
+            if d.get("confidence", 1.0) >= best.get(label, -1):
+                best[label] = d.get("confidence", 1.0)
+                regions[label] = region_of(d["bbox"], frame_width)
+
+        with self._cond:
+            self._observations.append({
+                "counts": counts,
+                "regions": regions,
+            })
+            self._version += 1
+            self._cond.notify_all()
+
+    def add_caption(self, caption):
+        """Hand over a scene caption to merge into the narration (any thread)"""
+        with self._cond:
+            self._new_caption = caption
+            self._version += 1
+            self._cond.notify_all()
+
+    def _caption_is_new(self, caption):
+        if self._spoken_caption is None:
+            return True
+        old = set(self._spoken_caption.lower().split())
+        new = set(caption.lower().split())
+        return len(old & new) / max(len(old | new), 1) <= CAPTION_OVERLAP
+
+    def start(self):
+        if not self._running:
+            self._running = True
+            threading.Thread(target=self._run, name="narrator", daemon=True).start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def _smooth(self, observations):
+        """Debounced {label: (count, region)} over the observation window"""
+        n = len(observations)
+        labels = set()
+        for obs in observations:
+            labels.update(obs["counts"])
+        labels.update(self._present)
+
+        present = {}
+        for label in labels:
+            seen = [obs for obs in observations if obs["counts"].get(label)]
+            ratio = len(seen) / n
+
+            # Hysteresis: harder to appear than to stay
+            was_present = label in self._present
+            if ratio >= self.appear_ratio or (was_present and ratio > self.disappear_ratio):
+                counts = sorted(obs["counts"][label] for obs in seen)
+                count = counts[len(counts) // 2]
+                region = Counter(obs["regions"][label] for obs in seen).most_common(1)[0][0]
+                present[label] = (count, region)
+        return present
+
+    def _changes(self):
+        """List of (priority, label, sentence) for differences from what was last spoken"""
+        changes = []
+        for label, (count, region) in self._present.items():
+            if label not in self._spoken:
+                priority = PRIORITY_URGENT if label in HAZARD_LABELS else PRIORITY_NORMAL
+                changes.append((priority, label, f"{_phrase(label, count)} on the {region}."))
+            else:
+                old_count, old_region = self._spoken[label]
+                if count != old_count:
+                    changes.append((PRIORITY_NORMAL, label, f"Now {_phrase(label, count)} on the {region}."))
+                elif region != old_region:
+                    changes.append((PRIORITY_LOW, label, f"The {label} moved to the {region}."))
+        for label in self._spoken:
+            if label not in self._present:
+                changes.append((PRIORITY_LOW, label, f"The {label} is gone."))
+        return sorted(changes)
+
+    def _run(self):
+        seen_version = 0
+        while True:
+            with self._cond:
+                # Wake on new observations, or periodically to retry rate-limited changes
+                self._cond.wait_for(lambda: not self._running or self._version != seen_version, 0.5)
+                if not self._running:
+                    return
+                seen_version = self._version
+                observations = list(self._observations)
+                caption = self._new_caption
+
+            changes = []
+            if observations:
+                self._present = self._smooth(observations)
+                changes = self._changes()
+            # Scene captions come after object changes of the same importance
+            if caption is not None:
+                if self._caption_is_new(caption):
+                    changes.append((PRIORITY_LOW, "~caption", f"It looks like {caption}."))
+                else:
+                    with self._cond:
+                        if self._new_caption == caption:
+                            self._new_caption = None
+            if not changes:
+                continue
+
+            # Only the most important changes go out now; the rest wait their turn.
+            # Nothing queues up behind an unfinished announcement except hazards,
+            # which cut in
+            priority = changes[0][0]
+            now = time.monotonic()
+            if now - self._last_spoken_at.get(priority, 0) < MIN_INTERVALS[priority]:
+                continue
+            urgent = priority == PRIORITY_URGENT
+            if self._pending is not None and not self._pending.done() and not urgent:
+                continue
+
+            batch = [c for c in changes if c[0] == priority]
+            self._pending = self.speech.speak(" ".join(sentence for _, _, sentence in batch),
+                                              priority=priority, interrupt=urgent)
+            self._last_spoken_at[priority] = now
+            for _, label, _ in batch:
+                if label == "~caption":
+                    self._spoken_caption = caption
+                    with self._cond:
+                        if self._new_caption == caption:
+                            self._new_caption = None
+                elif label in self._present:
+                    self._spoken[label] = self._present[label]
+                else:
+                    self._spoken.pop(label, None)
@@ -0,0 +1,395 @@
+import atexit
+import hashlib
+import json
+import os
+import uuid
+import warnings
+from contextlib import contextmanager
+
+import numpy as np
+import torch
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows: every process keeps its own copy
+
+# Opt-in: with several worker processes (gunicorn workers, parallel video
+# segments) every process would otherwise hold its own copy of each model
+SHARED_WEIGHTS_ENABLED = os.environ.get("VISION_SHARED_WEIGHTS", "0") == "1"
+# Where published weights live; a tmpfs so the files are the shared memory
+SHARED_WEIGHTS_DIR = os.environ.get("VISION_SHARED_WEIGHTS_DIR", "/dev/shm/vision-weights")
+# Tensor offsets in a weight file are aligned to this many bytes
+TENSOR_ALIGNMENT = 64
+
+# Models this process holds a reference on
+_attached = set()
+
+
+def _paths(key):
+    stem = os.path.join(SHARED_WEIGHTS_DIR, key.replace("/", "--"))
+    return {
+        "stem": stem,
+        "manifest": stem + ".json",
+        "lock": stem + ".lock",
+        "holders": stem + ".holders",
+    }
+
+
+@contextmanager
+def _locked(key):
+    """Exclusive lock across processes on one model's files"""
+    # The lock file itself is never removed, so waiters always lock the same file
+    with open(_paths(key)["lock"], "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _named_tensors(module):
+    """(name, tensor, is_parameter) for all parameters and buffers, tied names kept"""
+    for name, tensor in module.named_parameters(remove_duplicate=False):
+        yield name, tensor, True
+    # Non-persistent buffers are not in the state dict but must be shared too
+    for name, tensor in module.named_buffers(remove_duplicate=False):
+        if tensor is not None:
+            yield name, tensor, False
+
+
+def _read_manifest(key):
+    try:
+        with open(_paths(key)["manifest"]) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _remove_published(key, manifest):
+    paths = _paths(key)
+    files = [paths["manifest"]]
+    if manifest is not None:
+        files.append(os.path.join(SHARED_WEIGHTS_DIR, manifest["data"]))
+    for path in files:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def publish(key, module, fingerprint=""):
+    """
+    Write a module's tensors into one file in shared memory
+
+    Tensors are stored back to back (aligned) in a data file; the JSON
+    manifest lists name, dtype, shape and offset of each, the data file
+    and the fingerprint of the model that wrote it. Tied weights are
+    stored once and listed under every name. The manifest is written
+    last and renamed into place, so readers see either the previous
+    complete copy or the new one. Call with the model's lock held.
+
+    Args:
+        key (str): Model name, e.g. the Hugging Face model id
+        module (torch.nn.Module): Loaded model (on the CPU)
+        fingerprint (str): Identifies the model version (see load_shared)
+    """
+    paths = _paths(key)
+    previous = _read_manifest(key)
+    token = uuid.uuid4().hex
+    data_name = f"{os.path.basename(paths['stem'])}.{token}.bin"
+    entries = []
+    offsets = {}
+    offset = 0
+    with open(os.path.join(SHARED_WEIGHTS_DIR, data_name), "wb") as f:
+        for name, tensor, parameter in _named_tensors(module):
+            tensor = tensor.detach()
+            storage = (tensor.untyped_storage().data_ptr(), tensor.storage_offset(),
+                       tuple(tensor.shape), tensor.dtype)
+            if storage not in offsets:
+                offset = -(-offset // TENSOR_ALIGNMENT) * TENSOR_ALIGNMENT
+                f.seek(offset)
+                raw = tensor.cpu().contiguous().reshape(-1).view(torch.uint8).numpy()
+                f.write(raw.tobytes())
+                offsets[storage] = offset
+                offset += raw.nbytes
+            entries.append({
+                "name": name,
+                "dtype": str(tensor.dtype).replace("torch.", ""),
+                "shape": list(tensor.shape),
+                "offset": offsets[storage],
+                "parameter": parameter,
+            })
+    manifest = {
+        "key": key,
+        "fingerprint": fingerprint,
+        "torch": torch.__version__,
+        "token": token,
+        "data": data_name,
+        "size": offset,
+        "tensors": entries,
+    }
+    with open(paths["manifest"] + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(paths["manifest"] + ".tmp", paths["manifest"])
+
+    # Processes still mapping the old copy keep it until they exit
+    if previous is not None and os.path.exists(os.path.join(SHARED_WEIGHTS_DIR, previous["data"])):
+        os.remove(os.path.join(SHARED_WEIGHTS_DIR, previous["data"]))
+    return manifest
+
+
+def _current(manifest, fingerprint):
+    """Whether a manifest was written by this model version and torch version"""
+    return (manifest is not None and manifest.get("fingerprint") == fingerprint
+            and manifest.get("torch") == torch.__version__)
+
+
+def _fits(manifest, module, fingerprint):
+    """Whether a published copy was written for this model version and architecture"""
+    if not _current(manifest, fingerprint):
+        return False
+    data = os.path.join(SHARED_WEIGHTS_DIR, manifest["data"])
+    if not os.path.exists(data) or os.path.getsize(data) < manifest["size"]:
+        return False
+    # dtypes are the published copy's; a meta skeleton's placeholders don't have them
+    published = {e["name"]: (tuple(e["shape"]), e["parameter"]) for e in manifest["tensors"]}
+    expected = {name: (tuple(tensor.shape), parameter) for name, tensor, parameter in _named_tensors(module)}
+    return published == expected
+
+
+def _set_tensor(module, name, tensor, parameter):
+    owner_name, _, attr = name.rpartition(".")
+    owner = module.get_submodule(owner_name) if owner_name else module
+    if parameter:
+        owner._parameters[attr] = torch.nn.Parameter(tensor, requires_grad=False)
+    else:
+        owner._buffers[attr] = tensor
+
+
+def _map(manifest, module):
+    mapped = np.memmap(os.path.join(SHARED_WEIGHTS_DIR, manifest["data"]), dtype=np.uint8, mode="r")
+
+    shared = {}
+    with warnings.catch_warnings():
+        # torch warns that the array is not writable; inference never writes
+        warnings.simplefilter("ignore", UserWarning)
+        for entry in manifest["tensors"]:
+            dtype = getattr(torch, entry["dtype"])
+            nbytes = int(np.prod(entry["shape"], dtype=np.int64)) * torch.empty((), dtype=dtype).element_size()
+            view_key = (entry["offset"], entry["dtype"], tuple(entry["shape"]))
+            if view_key not in shared:
+                raw = torch.from_numpy(mapped[entry["offset"]:entry["offset"] + nbytes])
+                shared[view_key] = raw.view(dtype).reshape(entry["shape"])
+            _set_tensor(module, entry["name"], shared[view_key], entry["parameter"])
+
+    # Anything the copy didn't cover would fail much later, inside inference
+    missing = [name for name, tensor, _ in _named_tensors(module) if tensor.is_meta]
+    if missing:
+        raise ValueError(f"Published weights lack {len(missing)} tensors, e.g. {missing[0]}")
+    return module.eval()
+
+
+def attach(key, module, fingerprint=""):
+    """
+    Replace a module's tensors by read-only views of the published weights
+
+    The weight file is mapped read-only, so every process attached to
+    it shares the same physical pages; the module's own copies (if it
+    had any) are freed. The module may be a skeleton on the meta device.
+    The tensors must not be modified in place: the mapping is read-only.
+
+    Args:
+        key (str): Model name given to publish
+        module (torch.nn.Module): Model with the same architecture
+        fingerprint (str): Must match the one the weights were published with
+
+    Returns:
+        torch.nn.Module: The same module, now backed by shared memory
+
+    Raises:
+        ValueError: Nothing usable is published for this model and architecture
+    """
+    with _locked(key):
+        manifest = _read_manifest(key)
+        if not _fits(manifest, module, fingerprint):
+            raise ValueError(f"No matching shared weights published for {key}")
+        _map(manifest, module)
+        _hold(key)
+    return module
+
+
+def _live_holders(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        pids = {int(line) for line in f if line.strip()}
+    alive = set()
+    for pid in pids:
+        try:
+            os.kill(pid, 0)
+            alive.add(pid)
+        except ProcessLookupError:
+            pass  # Died without releasing
+        except PermissionError:
+            alive.add(pid)
+    return alive
+
+
+def _write_holders(path, pids):
+    with open(path, "w") as f:
+        f.write("".join(f"{pid}\n" for pid in sorted(pids)))
+
+
+def _hold(key):
+    """Register this process as a holder (with the model's lock held)"""
+    if key not in _attached:
+        path = _paths(key)["holders"]
+        _write_holders(path, _live_holders(path) | {os.getpid()})
+        _attached.add(key)
+
+
+def release(key):
+    """
+    Drop this process's reference to a published model
+
+    The holder list is pruned of processes that died without releasing;
+    when nobody holds the model any more its shared memory is removed.
+    Mappings already open stay valid until their process exits.
+    """
+    if key not in _attached:
+        return
+    _attached.discard(key)
+    paths = _paths(key)
+    with _locked(key):
+        holders = _live_holders(paths["holders"]) - {os.getpid()}
+        if holders:
+            _write_holders(paths["holders"], holders)
+            return
+        _remove_published(key, _read_manifest(key))
+        if os.path.exists(paths["holders"]):
+            os.remove(paths["holders"])
+
+
+@atexit.register
+def release_all():
+    for key in list(_attached):
+        release(key)
+
+
+def _hold_after_fork():
+    # A forked child shares the parent's mappings; count it as a holder of its own
+    keys = list(_attached)
+    _attached.clear()
+    for key in keys:
+        with _locked(key):
+            _hold(key)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_hold_after_fork)
+
+
+def _try_attach(key, model, module_of, fingerprint):
+    """Attach to the published copy if it fits (lock held); token of the rejected copy otherwise"""
+    manifest = _read_manifest(key)
+    if not _fits(manifest, module_of(model), fingerprint):
+        return False, manifest and manifest["token"]
+    try:
+        _map(manifest, module_of(model))
+    except ValueError as e:
+        print(f"⚠️ Shared weights for {key} don't fit: {e}")
+        return False, manifest["token"]
+    _hold(key)
+    return True, None
+
+
+def load_shared(key, load, skeleton=None, module_of=None, fingerprint=""):
+    """
+    Load a model once per machine and attach every process to that copy
+
+    The first process to ask loads the model normally and publishes its
+    weights; later ones build a skeleton (no weights) and attach. Even the
+    first process swaps its private tensors for the shared ones, so all
+    of them count the weights once.
+
+    A published copy is only used if it was written with the same
+    fingerprint and has exactly the tensors (names and shapes) of
+    the model being built. Copies left over from killed processes or
+    older model versions are replaced. Skeletons are built without the
+    lock held; only the publishing process keeps it while loading, so
+    the others wait for its copy instead of loading their own.
+
+    Without shared weights enabled, or if SHARED_WEIGHTS_DIR is not
+    usable, this is just load().
+
+    Args:
+        key (str): Model name
+        load (callable): Loads the model with its weights
+        skeleton (callable): Builds the model without weights (default: load)
+        module_of (callable): Gets the torch module from what load returns
+        fingerprint (str): Identifies the model version, e.g. a config hash
+
+    Returns:
+        The model, as returned by load or skeleton
+    """
+    if not SHARED_WEIGHTS_ENABLED or fcntl is None:
+        return load()
+    module_of = module_of or (lambda model: model)
+    try:
+        os.makedirs(SHARED_WEIGHTS_DIR, exist_ok=True)
+        rejected = None
+        for _ in range(3):
+            manifest = _read_manifest(key)
+            if _current(manifest, fingerprint) and manifest["token"] != rejected:
+                model = (skeleton or load)()
+                with _locked(key):
+                    attached, rejected = _try_attach(key, model, module_of, fingerprint)
+                if attached:
+                    return model
+
+            with _locked(key):
+                manifest = _read_manifest(key)
+                if not _current(manifest, fingerprint) or manifest["token"] == rejected:
+                    model = load()
+                    publish(key, module_of(model), fingerprint)
+                    print(f"🧠 Published {key} weights to {SHARED_WEIGHTS_DIR}")
+                    attached, _ = _try_attach(key, model, module_of, fingerprint)
+                    if not attached:
+                        raise OSError("the weights just published don't fit the model")
+                    return model
+            # Another process published a new copy while we waited; attach to that
+        raise OSError("the published weights keep changing")
+    except OSError as e:
+        print(f"⚠️ Shared weights unavailable for {key} ({e}); using a private copy")
+        return load()
+
+
+def load_pretrained(model_class, model_name):
+    """
+    from_pretrained for a Hugging Face model, through load_shared
+
+    Attaching processes instantiate the architecture on the meta device
+    from the config alone, so they never read or allocate the weights.
+    The fingerprint is a hash of the config and the transformers version.
+    """
+    if not SHARED_WEIGHTS_ENABLED or fcntl is None:
+        return model_class.from_pretrained(model_name)
+
+    import transformers
+    from transformers import GenerationConfig
+
+    config = model_class.config_class.from_pretrained(model_name)
+    fingerprint = hashlib.sha256(
+        f"{model_name}:{transformers.__version__}:{config.to_json_string()}".encode()
+    ).hexdigest()
+
+    def skeleton():
+        with torch.device("meta"):
+            model = model_class(config)
+        try:
+            model.generation_config = GenerationConfig.from_pretrained(model_name)
+        except OSError:
+            pass  # Model ships no generation config; the one from the model config applies
+        return model
+
+    return load_shared(model_name, lambda: model_class.from_pretrained(model_name), skeleton,
+                       fingerprint=fingerprint)
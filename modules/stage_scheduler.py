@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+
+# Model stages that get a dedicated executor and thread budget
+DEFAULT_STAGE_WEIGHTS = {
+    "caption": 3,    # BLIP captioning
+    "ocr": 3,        # TrOCR + EasyOCR
+    "detection": 2,  # YOLOv8
+    "vqa": 2,        # BLIP VQA
+}
+
+# Path to a JSON layout file describing the per-deployment core partitioning
+LAYOUT_ENV_VAR = "VISION_STAGE_LAYOUT"
+
+
+def available_cores():
+    """Return the list of CPU ids this process is allowed to run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def default_layout(cores=None, pin=False):
+    """
+    Split the available cores between the model stages proportionally to their weights
+
+    Args:
+        cores (list): CPU ids to partition (defaults to all available cores)
+        pin (bool): Whether to pin each stage's threads to its cores
+
+    Returns:
+        dict: Layout in the same format as the JSON layout file
+    """
+    cores = list(cores) if cores is not None else available_cores()
+    total_weight = sum(DEFAULT_STAGE_WEIGHTS.values())
+
+    stages = {}
+    start = 0
+    for name, weight in DEFAULT_STAGE_WEIGHTS.items():
+        share = max(1, round(len(cores) * weight / total_weight))
+        stage_cores = cores[start:start + share]
+        if not stage_cores:
+            # Fewer cores than stages: wrap around and share
+            stage_cores = [cores[start % len(cores)]]
+        start += share
+        stages[name] = {
+            "threads": len(stage_cores),
+            "cores": stage_cores if pin else None,
+            "workers": 1,
+        }
+
+    return {
+        "interop_threads": 1,
+        "stages": stages,
+    }
+
+
+def load_layout(path=None):
+    """
+    Load a stage layout from a JSON file, falling back to the default split
+
+    The file looks like:
+        {
+            "interop_threads": 2,
+            "stages": {
+                "caption":   {"threads": 4, "cores": [0, 1, 2, 3]},
+                "detection": {"threads": 2, "cores": [4, 5]},
+                "ocr":       {"threads": 2, "cores": [6, 7], "workers": 1}
+            }
+        }
+
+    Stages missing from the file keep their default budget.
+    """
+    path = path or os.environ.get(LAYOUT_ENV_VAR)
+    layout = default_layout()
+    if not path:
+        return layout
+
+    with open(path, "r", encoding="utf-8") as f:
+        custom = json.load(f)
+
+    layout["interop_threads"] = custom.get("interop_threads", layout["interop_threads"])
+    for name, stage in custom.get("stages", {}).items():
+        layout["stages"].setdefault(name, {"threads": 1, "cores": None, "workers": 1})
+        layout["stages"][name].update(stage)
+    return layout
+
+
+class _Stage:
+    """A model stage with its own thread budget and executor"""
+
+    def __init__(self, name, threads=1, cores=None, workers=1):
+        self.name = name
+        self.threads = max(1, int(threads))
+        self.cores = list(cores) if cores else None
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(1, int(workers)),
+            thread_name_prefix=f"stage-{name}",
+            initializer=self._init_worker,
+        )
+
+    def _init_worker(self):
+        # On OpenMP builds the intra-op thread count is per calling thread,
+        # so each stage worker gets its own budget instead of every core.
+        # ATen copies the process-wide count into a new thread the first time
+        # it runs an op, so trigger that copy before setting our own budget;
+        # otherwise whichever stage initialized last overrides the others.
+        torch.get_num_threads()
+        torch.set_num_threads(self.threads)
+        if self.cores and hasattr(os, "sched_setaffinity"):
+            # pid 0 targets the calling thread on Linux
+            os.sched_setaffinity(0, self.cores)
+
+
+class StageScheduler:
+    def __init__(self, layout=None):
+        """
+        Create one executor per model stage using the given core layout
+
+        Args:
+            layout (dict): Stage layout (see load_layout); loaded from
+                $VISION_STAGE_LAYOUT or split automatically if omitted
+        """
+        layout = layout or load_layout()
+
+        # Inter-op threads can only be configured once, before any parallel work
+        interop = layout.get("interop_threads")
+        if interop:
+            try:
+                torch.set_num_interop_threads(int(interop))
+            except RuntimeError:
+                pass
+
+        self.stages = {
+            name: _Stage(name, **cfg)
+            for name, cfg in layout.get("stages", {}).items()
+        }
+
+        summary = ", ".join(f"{s.name}={s.threads}t" for s in self.stages.values())
+        print(f"🧵 Stage scheduler ready: {summary}")
+
+    def submit(self, stage, fn, *args, **kwargs):
+        """
+        Run fn on the executor of the given stage
+
+        Returns:
+            concurrent.futures.Future: Future holding fn's result
+        """
+        if stage not in self.stages:
+            raise ValueError(f"Unknown stage: {stage}")
+        return self.stages[stage].executor.submit(fn, *args, **kwargs)
+
+    def run(self, stage, fn, *args, **kwargs):
+        """Run fn on the given stage and wait for its result"""
+        return self.submit(stage, fn, *args, **kwargs).result()
+
+    def shutdown(self, wait=True):
+        for stage in self.stages.values():
+            stage.executor.shutdown(wait=wait)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Return the process-wide stage scheduler, creating it on first use"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = StageScheduler()
+        return _scheduler
@@ -3,35 +3,233 @@ import torch
 import numpy as np
 from PIL import Image
 import os
-import tempfile
-from collections import Counter
+import itertools
+import multiprocessing
+import queue
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import Counter, deque
 from datetime import datetime
 import time
 
 # Import existing modules for consistent results
 from modules.vlm_captioning import describe_scene
 from modules.object_detection import detect_objects
+from modules.stage_scheduler import get_scheduler, available_cores
+from modules.camera_capture import CameraStream, Frame
+from modules.frame_signatures import color_histogram, histogram_distance, dhash, hamming_distance
+from modules.image_io import load_image
+from modules.keyframes import select_keyframes, frame_distances
+from modules.iframe_index import iter_iframes, keyframe_index
+from modules.video_index import VideoIndex, index_path, save_index
+
+# Consecutive unreadable frames tolerated before giving up on a stream
+MAX_READ_FAILURES = 30
+# Farthest a frame is walked to with grab(); beyond this a seek is cheaper
+# (about one GOP of a typical H.264 file)
+MAX_GRAB_GAP = 150
+
+# Frames handed to the models before waiting for the oldest results
+MAX_FRAMES_IN_FLIGHT = 2
+
+# Frames whose 64-bit perceptual hashes differ in at most this many bits share one analysis
+DEDUP_HAMMING_THRESHOLD = 6
+# ... and whose color histograms are at most this far apart
+DEDUP_COLOR_DISTANCE = 0.2
+
+# Frames scored when choosing keyframes, and the size they are scored at
+KEYFRAME_CANDIDATES = 240
+SIGNATURE_MAX_SIDE = 160
+
+# Default core budget of one segment worker in analyze_video_parallel
+CORES_PER_SEGMENT_WORKER = 4
+
+# Assumed seconds per analyzed frame (caption + detection on CPU) until measured
+INITIAL_FRAME_COST = 2.0
+# Share of the sampling weight spread evenly, so static stretches still get frames
+BASELINE_COVERAGE = 0.3
+# Share of a time budget the change scan in plan_frames may use
+PLAN_SCAN_SHARE = 0.2
+
+
+def resize_max_side(frame, max_side):
+    """Downscale a frame so its longer side is at most max_side (None keeps it as is)"""
+    if not max_side:
+        return frame
+    h, w = frame.shape[:2]
+    scale = max_side / max(h, w)
+    if scale >= 1:
+        return frame
+    return cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+
+
+def count_frames(cap):
+    """Count frames by walking the stream with grab() when the container doesn't say"""
+    count = 0
+    failures = 0
+    while failures < MAX_READ_FAILURES:
+        if cap.grab():
+            count += 1
+            failures = 0
+        else:
+            # A damaged frame and the end of the stream look the same; only a run
+            # of failures ends the count
+            failures += 1
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    return count
+
+
+def decode_frames_at(cap, indices, max_side=None):
+    """
+    Decode only the requested frame indices, in playback order
+
+    A target at most MAX_GRAB_GAP frames ahead is reached with grab(),
+    which still decodes but skips the conversion to BGR; a farther (or
+    earlier) one is sought, which only decodes from the nearest keyframe.
+    Dense samples so cost one pass, sparse ones a seek each.
+
+    Yields:
+        tuple: (frame_index, BGR frame)
+    """
+    position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    failures = 0
+    for target in sorted(set(int(i) for i in indices)):
+        if (target < position or target - position > MAX_GRAB_GAP) \
+                and cap.set(cv2.CAP_PROP_POS_FRAMES, target):
+            position = target
+        if target < position:
+            continue
+        while position < target:
+            if not cap.grab():
+                failures += 1
+                if failures >= MAX_READ_FAILURES:
+                    return
+            else:
+                failures = 0
+            position += 1
+
+        ret, frame = cap.read()
+        position += 1
+        if ret:
+            failures = 0
+            yield target, resize_max_side(frame, max_side)
+        else:
+            failures += 1
+            if failures >= MAX_READ_FAILURES:
+                return
+
+
+def common_themes(descriptions):
+    """Frequent meaningful words across scene descriptions"""
+    all_words = ' '.join(descriptions).lower().split()
+    word_counter = Counter(all_words)
+    return [word for word, count in word_counter.most_common(10) 
+            if len(word) > 3 and word not in ['this', 'that', 'with', 'from']]
+
+
+def merge_analyses(analyses):
+    """
+    Combine analyze_frames results of consecutive parts of a video, in order
+    
+    Args:
+        analyses (list): analysis_data dicts in playback order
+        
+    Returns:
+        dict: One analysis_data for generate_video_description
+    """
+    scene_descriptions = []
+    timestamps = []
+    frame_indices = []
+    frame_detections = []
+    frame_text = []
+    representative_frames = []
+    unique_descriptions = []
+    object_counter = Counter()
+    
+    for analysis in analyses:
+        offset = len(unique_descriptions)
+        reps = analysis.get("representative_frames") or list(range(len(analysis["scene_descriptions"])))
+        seen = set()
+        for description, rep in zip(analysis["scene_descriptions"], reps):
+            if rep not in seen:
+                seen.add(rep)
+                unique_descriptions.append(description)
+        scene_descriptions.extend(analysis["scene_descriptions"])
+        count = len(analysis["scene_descriptions"])
+        timestamps.extend(analysis.get("timestamps") or [None] * count)
+        frame_indices.extend(analysis.get("frame_indices") or [None] * count)
+        frame_detections.extend(analysis.get("frame_detections") or [[]] * count)
+        frame_text.extend(analysis.get("frame_text") or [None] * count)
+        representative_frames.extend(offset + rep for rep in reps)
+        object_counter.update(analysis["detection_counts"])
+    
+    frames = len(scene_descriptions)
+    return {
+        "scene_descriptions": scene_descriptions,
+        "timestamps": timestamps,
+        "top_objects": object_counter.most_common(5),
+        "common_themes": common_themes(unique_descriptions),
+        "detection_counts": dict(object_counter),
+        "frame_indices": frame_indices,
+        "frame_detections": frame_detections,
+        "frame_text": frame_text,
+        "representative_frames": representative_frames,
+        "frames_analyzed": len(unique_descriptions),
+        "reuse_ratio": (frames - len(unique_descriptions)) / max(frames, 1)
+    }
+
+
+def _init_segment_worker(core_slices):
+    """Pin a segment worker to its own cores before any model is loaded"""
+    cores = core_slices.get()
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+
+
+_segment_processor = None
+
+
+def _analyze_segment(video_path, segment, n_frames, method, max_side, ocr):
+    """Decode and analyze one segment inside a worker process"""
+    global _segment_processor
+    if _segment_processor is None:
+        # Once per worker; the caption and detection models (and OCR only if
+        # asked for) are loaded on first use, not by importing the parent's modules
+        _segment_processor = VideoCaptioningProcessor()
+    frames = _segment_processor.iter_frames(video_path, n_frames, method, max_side, segment=segment)
+    return _segment_processor.analyze_frames(frames, ocr=ocr)
+
 
 class VideoCaptioningProcessor:
     def __init__(self):
         """Initialize the video captioning processor"""
         print("📚 Loading video captioning module...")
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        # Running estimate of the seconds one analyzed frame costs (for time budgets)
+        self.frame_cost = INITIAL_FRAME_COST
         # Using existing models loaded in other modules
         print(f"✅ Video captioning module ready on {self.device}")
     
-    def extract_frames(self, video_path, n_frames=5, method="uniform"):
+    def iter_frames(self, video_path, n_frames=5, method="uniform", max_side=None, segment=None):
         """
-        Extract representative frames from a video
+        Decode representative frames from a video one at a time
+        
+        Frames stay in memory as BGR arrays and are handed over as soon as
+        they are decoded, so a long video never holds more than the frame
+        being analyzed.
         
         Args:
             video_path (str): Path to the video file
             n_frames (int): Number of frames to extract
-            method (str): Method to use for sampling frames ('uniform', 'keyframe', etc.)
+            method (str): Method to use for sampling frames ('uniform', 'keyframe' or 'iframe')
+            max_side (int): Downscale frames so their longer side is at most this
+            segment (tuple): Only sample frames in [first, stop) ('uniform' and 'keyframe')
             
-        Returns:
-            list: List of extracted frame paths
+        Yields:
+            Frame: (image, timestamp in seconds, frame index)
         """
+        if segment is not None and method == "iframe":
+            raise ValueError("The 'iframe' method always covers the whole video")
+        
         print(f"🎬 Extracting {n_frames} frames from video...")
         
         # Open the video file
@@ -40,132 +238,471 @@ class VideoCaptioningProcessor:
         # Get video properties
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         fps = cap.get(cv2.CAP_PROP_FPS)
+        if total_frames <= 0:
+            # Some containers don't store a frame count
+            total_frames = count_frames(cap)
         duration = total_frames / fps if fps > 0 else 0
         
         print(f"📊 Video info: {total_frames} frames, {fps:.1f} FPS, {duration:.1f} seconds")
         
-        # Create temporary directory for frames
-        temp_dir = tempfile.mkdtemp()
-        frame_paths = []
-        
-        if method == "uniform" and total_frames > 0:
-            # Uniform sampling - evenly distributed frames
-            frame_indices = np.linspace(0, total_frames-1, n_frames, dtype=int)
+        first, stop = 0, total_frames
+        if segment is not None:
+            first, stop = max(0, segment[0]), min(total_frames, segment[1])
+            cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+        length = stop - first
+        
+        try:
+            planned = []
+            if method == "uniform" and length > 0:
+                # Uniform sampling - evenly distributed frames
+                planned = np.linspace(first, stop-1, n_frames, dtype=int)
+                if segment is not None:
+                    # Centered samples, so neighbouring segments don't repeat their shared edge
+                    planned = (first + (np.arange(n_frames) + 0.5) * length / n_frames).astype(int)
             
-            for i, frame_idx in enumerate(frame_indices):
-                # Set position
-                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-                ret, frame = cap.read()
+            elif method == "keyframe" and length > 0:
+                # Shot-aware keyframes: signatures of evenly spaced candidates on
+                # tiny thumbnails, then only the chosen frames are decoded in full
+                step = max(1, length // KEYFRAME_CANDIDATES)
+                candidates = range(first, stop, step)
+                indices, histograms, hashes = [], [], []
+                for frame_idx, image in decode_frames_at(cap, candidates, SIGNATURE_MAX_SIDE):
+                    indices.append(frame_idx)
+                    histograms.append(color_histogram(image))
+                    hashes.append(dhash(image))
                 
-                if ret:
-                    # Save frame to temporary file
-                    frame_path = os.path.join(temp_dir, f"frame_{i:03d}.jpg")
-                    cv2.imwrite(frame_path, frame)
-                    frame_paths.append(frame_path)
-        
-        elif method == "keyframe":
-            # Simple keyframe extraction based on differences between frames
-            prev_frame = None
-            frame_count = 0
-            saved_count = 0
+                if indices:
+                    chosen = select_keyframes(np.array(histograms), np.array(hashes), n_frames)
+                    planned = [indices[i] for i in chosen]
+                cap.set(cv2.CAP_PROP_POS_FRAMES, first)
             
-            while True:
-                ret, frame = cap.read()
-                if not ret or saved_count >= n_frames:
-                    break
-                
-                if frame_count % (total_frames // (n_frames * 5)) == 0:
-                    # Convert to grayscale for comparison
-                    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                    
-                    # Compare with previous frame if available
-                    if prev_frame is not None:
-                        diff = cv2.absdiff(gray, prev_frame)
-                        non_zero_count = np.count_nonzero(diff)
-                        
-                        # If significant difference, save as keyframe
-                        if non_zero_count > gray.size * 0.1:  # 10% change threshold
-                            frame_path = os.path.join(temp_dir, f"frame_{saved_count:03d}.jpg")
-                            cv2.imwrite(frame_path, frame)
-                            frame_paths.append(frame_path)
-                            saved_count += 1
-                    else:
-                        # Always save first frame
-                        frame_path = os.path.join(temp_dir, f"frame_{saved_count:03d}.jpg")
-                        cv2.imwrite(frame_path, frame)
-                        frame_paths.append(frame_path)
-                        saved_count += 1
-                    
-                    prev_frame = gray
-                
-                frame_count += 1
+            elif method == "iframe":
+                # Only I-frames, located through the container index (needs PyAV)
+                keyframes = keyframe_index(video_path)
+                if len(keyframes) >= n_frames:
+                    extracted = 0
+                    for frame_idx, timestamp, image in iter_iframes(video_path, n_frames, max_side, keyframes):
+                        extracted += 1
+                        yield Frame(image, timestamp, frame_idx)
+                    print(f"✅ Extracted {extracted} frames")
+                    return
+                # Too few I-frames: all of them, topped up below
+                planned = [int(round(seconds * fps)) for _, seconds in keyframes]
+            
+            # If the method gives too few frames, fill in evenly spaced ones it didn't pick.
+            # They are merged into the same pass, so frames still come out in playback order
+            planned = {int(i) for i in planned if first <= i < stop}
+            missing = n_frames - len(planned)
+            if missing > 0 and length > len(planned):
+                print(f"⚠️ Could only pick {len(planned)} frames, adding evenly spaced frames...")
+                candidates = [i for i in np.linspace(first, stop-1, n_frames * 2, dtype=int)
+                              if i not in planned]
+                step = max(1, len(candidates) // missing)
+                planned.update(int(i) for i in candidates[::step][:missing])
+            
+            extracted = 0
+            for frame_idx, image in decode_frames_at(cap, planned, max_side):
+                extracted += 1
+                yield Frame(image, frame_idx / fps if fps > 0 else None, frame_idx)
+            print(f"✅ Extracted {extracted} frames")
+        finally:
+            # Release video capture (also when the consumer stops early)
+            cap.release()
+    
+    def extract_frames(self, video_path, n_frames=5, method="uniform", max_side=None):
+        """
+        Extract representative frames from a video
         
-        # Release video capture
-        cap.release()
+        Same arguments as iter_frames; prefer iter_frames for long videos.
         
-        # If we couldn't extract enough frames, add some randomly
-        if len(frame_paths) < n_frames:
-            print(f"⚠️ Could only extract {len(frame_paths)} frames, adding random frames...")
-            
-            cap = cv2.VideoCapture(video_path)
-            while len(frame_paths) < n_frames:
-                random_idx = np.random.randint(0, total_frames)
-                cap.set(cv2.CAP_PROP_POS_FRAMES, random_idx)
-                ret, frame = cap.read()
-                
-                if ret:
-                    frame_path = os.path.join(temp_dir, f"frame_r{len(frame_paths):03d}.jpg")
-                    cv2.imwrite(frame_path, frame)
-                    frame_paths.append(frame_path)
+        Returns:
+            list: Extracted frames as (image, timestamp, index)
+        """
+        return list(self.iter_frames(video_path, n_frames, method, max_side))
+    
+    def plan_frames(self, video_path, budget, max_frames=None):
+        """
+        Choose how many frames to analyze, and where, within a time budget
+        
+        A quick scan scores evenly spaced thumbnails for visual change. It
+        visits them coarse to fine (every 16th candidate, then the ones in
+        between, ...) and stops after PLAN_SCAN_SHARE of the budget, so a
+        slow-to-decode video still gets an even, if sparser, scan.
+        The time left after the scan, divided by the running per-frame cost
+        estimate, gives the number of frames; they are placed at even
+        steps of accumulated change, so dynamic segments get more samples
+        while a baseline share keeps static stretches covered.
+        
+        Args:
+            video_path (str): Path to the video file
+            budget (float): Wall-clock seconds for the whole captioning job
+            max_frames (int): Upper limit on the number of frames
             
+        Returns:
+            list: Sorted frame indices to analyze
+        """
+        start = time.monotonic()
+        scan_deadline = start + budget * PLAN_SCAN_SHARE
+        cap = cv2.VideoCapture(video_path)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if total_frames <= 0:
+            total_frames = count_frames(cap)
+        
+        step = max(1, total_frames // KEYFRAME_CANDIDATES)
+        candidates = list(range(0, total_frames, step))
+        passes = [candidates[::16]] + [candidates[stride // 2::stride] for stride in (16, 8, 4, 2)]
+        scanned = {}
+        try:
+            for candidate_pass in passes:
+                for frame_idx, image in decode_frames_at(cap, candidate_pass, SIGNATURE_MAX_SIDE):
+                    scanned[frame_idx] = (color_histogram(image), dhash(image))
+                    if time.monotonic() > scan_deadline:
+                        break
+                if time.monotonic() > scan_deadline:
+                    print(f"⏳ Scan stopped after {len(scanned)} of {len(candidates)} candidates")
+                    break
+        finally:
             cap.release()
+        if not scanned:
+            return []
+        
+        indices = sorted(scanned)
+        histograms = np.array([scanned[i][0] for i in indices])
+        hashes = np.array([scanned[i][1] for i in indices])
+        
+        remaining = budget - (time.monotonic() - start)
+        n_frames = int(max(1, remaining // self.frame_cost))
+        n_frames = min(n_frames, len(candidates), max_frames or len(candidates))
+        print(f"⏳ Budget {budget:.0f}s at ~{self.frame_cost:.1f}s per frame: analyzing {n_frames} frames")
+        
+        # Change around each scanned candidate, plus an even baseline
+        change = np.zeros(len(indices))
+        if len(indices) > 1:
+            distances = frame_distances(histograms, hashes)
+            change[1:] += distances / 2
+            change[:-1] += distances / 2
+        mean_change = change.mean()
+        if mean_change > 0:
+            weight = (1 - BASELINE_COVERAGE) * change / mean_change + BASELINE_COVERAGE
+        else:
+            weight = np.ones(len(indices))
+        # A candidate's weight covers the frames up to the next scanned one
+        weight = weight * np.diff(indices + [total_frames])
+        
+        # Samples at even quantiles of the accumulated weight (inverse-CDF placement),
+        # interpolated between candidates so a sparse scan can still give many frames
+        cumulative = np.concatenate([[0], np.cumsum(weight)])
+        targets = (np.arange(n_frames) + 0.5) / n_frames * cumulative[-1]
+        positions = np.interp(targets, cumulative, indices + [total_frames])
+        return sorted({min(int(p), total_frames - 1) for p in positions})
+    
+    def iter_planned_frames(self, video_path, frame_indices, deadline=None, max_side=None):
+        """
+        Decode the given frames in one pass, stopping when the deadline can't be met
         
-        print(f"✅ Extracted {len(frame_paths)} frames")
-        return frame_paths
+        Up to MAX_FRAMES_IN_FLIGHT frames handed out earlier may still be
+        in analysis, so a frame is only handed out if it and those fit.
+        
+        Yields:
+            Frame: (image, timestamp in seconds, frame index)
+        """
+        cap = cv2.VideoCapture(video_path)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        try:
+            for count, (frame_idx, image) in enumerate(decode_frames_at(cap, frame_indices, max_side)):
+                # Always analyze one frame; after that, only what still fits the budget
+                pending = min(count, MAX_FRAMES_IN_FLIGHT)
+                if count and deadline is not None and time.monotonic() + (pending + 1) * self.frame_cost > deadline:
+                    print("⏳ Time budget reached, skipping the remaining frames")
+                    return
+                yield Frame(image, frame_idx / fps if fps > 0 else None, frame_idx)
+        finally:
+            cap.release()
+    
+    def record_frame_cost(self, elapsed, frames_analyzed):
+        """Fold the measured time of an analysis run into the per-frame cost estimate"""
+        if frames_analyzed > 0:
+            self.frame_cost = 0.5 * self.frame_cost + 0.5 * (elapsed / frames_analyzed)
     
-    def analyze_frames(self, frame_paths):
+    def analyze_frames(self, frames, dedup=True, dedup_threshold=DEDUP_HAMMING_THRESHOLD, ocr=False):
         """
         Analyze a set of frames from a video
         
+        Frames are consumed as they arrive, so a generator from iter_frames
+        is analyzed while the next frames are still being decoded.
+        
         Args:
-            frame_paths (list): List of frame image paths
+            frames (iterable): Frames from iter_frames/extract_frames, or
+                plain images (BGR arrays, PIL images or paths)
+            dedup (bool): Reuse the analysis of an earlier frame when a frame
+                looks the same (perceptual hash within dedup_threshold bits)
+            dedup_threshold (int): Maximum differing hash bits (of 64) for a duplicate
+            ocr (bool): Also read text in every frame (text-gated, for the video index)
             
         Returns:
             dict: Analysis data for the frames
         """
         print("🔍 Analyzing video frames...")
         
+        if ocr:
+            # OCR models are only loaded when a video index asks for text
+            from modules.ocr_reader import read_text_lines
+        
         # Collect scene descriptions for each frame
         scene_descriptions = []
         all_objects = []
-        
-        for frame_path in frame_paths:
-            # Get scene description using existing module
-            description = describe_scene(frame_path)
-            scene_descriptions.append(description)
+        timestamps = []
+        frame_indices = []
+        frame_detections = []
+        frame_text = []
+        
+        scheduler = get_scheduler()
+        in_flight = deque()
+        
+        # Frames that were actually analyzed: their signatures and analysis futures
+        representative_hashes = []
+        representative_histograms = []
+        representatives = []
+        representative_of = []
+        
+        def collect():
+            timestamp, frame_index, rep = in_flight.popleft()
+            description_future, detections_future, ocr_future = representatives[rep]
+            scene_descriptions.append(description_future.result())
+            timestamps.append(timestamp)
+            frame_indices.append(frame_index)
+            representative_of.append(rep)
+            frame_text.append(ocr_future.result()["text"] if ocr_future is not None else None)
             
-            # Detect objects using existing module
-            detections = detect_objects(frame_path)
+            detections = detections_future.result()
+            frame_detections.append(detections)
             frame_objects = [d["label"] for d in detections]
             all_objects.extend(frame_objects)
         
+        for frame in frames:
+            image = frame.image if isinstance(frame, Frame) else frame
+            timestamp = frame.timestamp if isinstance(frame, Frame) else None
+            frame_index = frame.index if isinstance(frame, Frame) else None
+            
+            # Near-identical frames (static camera, slow pan) reuse an earlier analysis
+            rep = None
+            if dedup:
+                if not isinstance(image, np.ndarray):
+                    image = cv2.cvtColor(np.array(load_image(image)), cv2.COLOR_RGB2BGR)
+                frame_hash = dhash(image)
+                frame_histogram = color_histogram(image)
+                if representative_hashes:
+                    distances = hamming_distance(np.array(representative_hashes), frame_hash)
+                    # dHash only sees brightness structure; the color check keeps
+                    # differently colored scenes with the same layout apart
+                    distances[histogram_distance(np.array(representative_histograms), frame_histogram)
+                              > DEDUP_COLOR_DISTANCE] = dedup_threshold + 1
+                    closest = int(np.argmin(distances))
+                    if distances[closest] <= dedup_threshold:
+                        rep = closest
+            
+            if rep is None:
+                # Caption and detect in parallel on their own stage executors
+                rep = len(representatives)
+                representatives.append((
+                    scheduler.submit("caption", describe_scene, image),
+                    scheduler.submit("detection", detect_objects, image),
+                    scheduler.submit("ocr", read_text_lines, image) if ocr else None,
+                ))
+                if dedup:
+                    representative_hashes.append(frame_hash)
+                    representative_histograms.append(frame_histogram)
+            
+            in_flight.append((timestamp, frame_index, rep))
+            # Only a couple of frames are kept in memory while the models work
+            if len(in_flight) > MAX_FRAMES_IN_FLIGHT:
+                collect()
+        while in_flight:
+            collect()
+        
+        analyzed = len(representatives)
+        reused = len(representative_of) - analyzed
+        if reused:
+            print(f"♻️ Reused analysis for {reused} of {len(representative_of)} near-duplicate frames")
+        
         # Count objects across all frames
         object_counter = Counter(all_objects)
         top_objects = object_counter.most_common(5)
         
-        # Analyze scene descriptions for common themes
-        all_words = ' '.join(scene_descriptions).lower().split()
-        word_counter = Counter(all_words)
-        common_words = [word for word, count in word_counter.most_common(10) 
-                        if len(word) > 3 and word not in ['this', 'that', 'with', 'from']]
+        # Analyze scene descriptions for common themes (each distinct frame counted once)
+        unique_descriptions = [representatives[rep][0].result() for rep in range(analyzed)]
         
         return {
             "scene_descriptions": scene_descriptions,
+            "timestamps": timestamps,
             "top_objects": top_objects,
-            "common_themes": common_words,
-            "detection_counts": dict(object_counter)
+            "common_themes": common_themes(unique_descriptions),
+            "detection_counts": dict(object_counter),
+            "frame_indices": frame_indices,
+            "frame_detections": frame_detections,
+            "frame_text": frame_text,
+            "representative_frames": representative_of,
+            "frames_analyzed": analyzed,
+            "reuse_ratio": reused / max(len(representative_of), 1)
         }
     
+    def analyze_video_parallel(self, video_path, n_frames=5, workers=None, method="uniform", max_side=None,
+                               ocr=False):
+        """
+        Analyze a long video in time segments on separate worker processes
+        
+        Every worker owns its decoder and models and runs on its own share
+        of the cores; the per-segment results are merged back in playback
+        order.
+        
+        Args:
+            video_path (str): Path to the video file
+            n_frames (int): Total number of frames to analyze
+            workers (int): Worker processes (defaults to one per 4 cores)
+            method (str): Sampling method within each segment ('uniform' or 'keyframe')
+            max_side (int): Downscale frames so their longer side is at most this
+            ocr (bool): Also read text in every frame
+            
+        Returns:
+            dict: Analysis data for the whole video
+        """
+        cap = cv2.VideoCapture(video_path)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if total_frames <= 0:
+            total_frames = count_frames(cap)
+        cap.release()
+        
+        cores = available_cores()
+        workers = workers or max(1, len(cores) // CORES_PER_SEGMENT_WORKER)
+        workers = max(1, min(workers, n_frames, total_frames))
+        
+        # Contiguous segments; frames shared out as evenly as possible
+        bounds = np.linspace(0, total_frames, workers + 1).round().astype(int)
+        counts = [n_frames // workers + (i < n_frames % workers) for i in range(workers)]
+        print(f"🧩 Analyzing {total_frames} frames in {workers} segments on separate processes...")
+        
+        context = multiprocessing.get_context("spawn")
+        core_slices = context.Queue()
+        for part in np.array_split(cores, workers):
+            core_slices.put([int(c) for c in part])
+        
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_segment_worker,
+                                 initargs=(core_slices,)) as pool:
+            futures = [
+                pool.submit(_analyze_segment, video_path, (int(bounds[i]), int(bounds[i + 1])),
+                            counts[i], method, max_side, ocr)
+                for i in range(workers)
+            ]
+            # Merged in segment order, whatever order the workers finish in
+            return merge_analyses([future.result() for future in futures])
+    
+    def _window_frames(self, source, window, frames_per_window, loop, max_duration, max_side):
+        """
+        Sampled frames of consecutive time windows of a file or live source
+        
+        Yields:
+            tuple: (window start, window end, list of Frame) with times in
+            seconds from the start of the input
+        """
+        offsets = [(k + 0.5) * window / frames_per_window for k in range(frames_per_window)]
+        
+        if isinstance(source, str) and os.path.isfile(source) and not loop:
+            # A finite file is read as fast as it decodes, one window at a time
+            cap = cv2.VideoCapture(source)
+            fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+            try:
+                for w in itertools.count():
+                    start = w * window
+                    if max_duration is not None and start >= max_duration:
+                        return
+                    indices = [int((start + offset) * fps) for offset in offsets]
+                    frames = [Frame(image, frame_idx / fps, frame_idx)
+                              for frame_idx, image in decode_frames_at(cap, indices, max_side)]
+                    if not frames:
+                        return
+                    yield start, start + window, frames
+            finally:
+                cap.release()
+            return
+        
+        # Cameras, streams and looping files are sampled in real time
+        camera = CameraStream(source, loop=loop).start()
+        try:
+            origin = time.monotonic()
+            w = 0
+            while True:
+                # When analysis falls behind a live source, skip to the current window
+                w = max(w, int((time.monotonic() - origin) // window))
+                start = w * window
+                w += 1
+                if max_duration is not None and start >= max_duration:
+                    return
+                frames = []
+                last_index = None
+                for offset in offsets:
+                    delay = origin + start + offset - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    grabbed = camera.read(newer_than=last_index)
+                    if grabbed is None:
+                        continue
+                    last_index = grabbed.index
+                    frames.append(Frame(resize_max_side(grabbed.image, max_side),
+                                        grabbed.timestamp - origin, grabbed.index))
+                if not frames:
+                    if camera.finished:
+                        return
+                    continue
+                yield start, start + window, frames
+        finally:
+            camera.stop()
+    
+    def stream_captions(self, source, window=10.0, frames_per_window=3, loop=False,
+                        max_duration=None, summary_windows=0, max_side=None):
+        """
+        Caption a video or live source window by window
+        
+        Only the frames of the current window and the analyses of the last
+        summary_windows windows are kept, so memory stays bounded however
+        long the input runs.
+        
+        Args:
+            source (int|str): Video file, camera index or stream URL (e.g. RTSP)
+            window (float): Window length in seconds
+            frames_per_window (int): Frames sampled from each window
+            loop (bool): Replay a video file endlessly in real time, as a
+                stand-in for a live stream
+            max_duration (float): Stop after this many seconds of input (None runs until the input ends)
+            summary_windows (int): Also summarize the last N windows (0 disables the rolling summary)
+            max_side (int): Downscale frames so their longer side is at most this
+            
+        Yields:
+            dict: {"start", "end", "caption", "objects", "summary", "analysis"}
+            with times in seconds from the start of the input
+        """
+        recent = deque(maxlen=summary_windows or 1)
+        windows = self._window_frames(source, window, frames_per_window, loop, max_duration, max_side)
+        
+        for start, end, frames in windows:
+            analysis = self.analyze_frames(frames)
+            
+            # The caption shared by most of the window's frames stands for the window
+            caption = Counter(analysis["scene_descriptions"]).most_common(1)[0][0]
+            result = {
+                "start": start,
+                "end": end,
+                "caption": caption,
+                "objects": [obj for obj, count in analysis["top_objects"]],
+                "summary": None,
+                "analysis": analysis,
+            }
+            
+            if summary_windows:
+                recent.append(analysis)
+                result["summary"] = self.generate_video_description(merge_analyses(recent))
+            
+            yield result
+    
     def generate_video_description(self, analysis_data):
         """
         Generate a natural language description of a video based on frame analysis
@@ -179,6 +716,10 @@ class VideoCaptioningProcessor:
         print("✍️ Generating video description...")
         
         descriptions = analysis_data["scene_descriptions"]
+        if not descriptions:
+            # Unreadable video, empty segment or no time left in the budget
+            print("⚠️ No frames were analyzed")
+            return "Could not analyze the video: no frames could be read."
         top_objects = analysis_data["top_objects"]
         common_themes = analysis_data["common_themes"]
         
@@ -216,13 +757,19 @@ class VideoCaptioningProcessor:
         print(f"✅ Description generated: {full_description}")
         return full_description
     
-    def caption_video(self, video_path, n_frames=5):
+    def caption_video(self, video_path, n_frames=5, workers=1, index=False, budget=None):
         """
         Generate a comprehensive caption for a video
         
         Args:
             video_path (str): Path to the video file
             n_frames (int): Number of frames to analyze
+            workers (int): Worker processes for segment-parallel analysis
+                (1 analyzes in this process, None picks one per 4 cores)
+            index (bool): Keep a searchable per-frame index (with OCR text)
+                next to the video, and reuse it instead of re-analyzing
+            budget (float): Seconds the job may take; the number and placement
+                of frames are then chosen to fit (n_frames and workers are ignored)
             
         Returns:
             str: Natural language caption of the video
@@ -231,11 +778,32 @@ class VideoCaptioningProcessor:
         start_time = time.time()
         print(f"🎥 Captioning video: {video_path}")
         
-        # Extract frames
-        frame_paths = self.extract_frames(video_path, n_frames=n_frames)
-        
-        # Analyze frames
-        analysis_data = self.analyze_frames(frame_paths)
+        existing = VideoIndex.load(video_path) if index else None
+        if existing is not None and existing.matches(n_frames, budget):
+            # Same video, same sampling: the stored per-frame results are enough
+            print(f"🗂️ Using the existing index {index_path(video_path)}")
+            analysis_data = merge_analyses([existing.to_analysis()])
+        elif budget is not None:
+            # As many frames as the budget allows, concentrated where the video changes
+            deadline = time.monotonic() + budget
+            frame_indices = self.plan_frames(video_path, budget)
+            analysis_start = time.monotonic()
+            analysis_data = self.analyze_frames(self.iter_planned_frames(video_path, frame_indices, deadline),
+                                                ocr=index)
+            self.record_frame_cost(time.monotonic() - analysis_start, analysis_data["frames_analyzed"])
+            if index:
+                save_index(video_path, analysis_data, len(frame_indices), sampling="budget", budget=budget)
+        else:
+            if workers == 1:
+                # Extract and analyze frames (decoded in memory while earlier ones are analyzed)
+                analysis_start = time.monotonic()
+                frames = self.iter_frames(video_path, n_frames=n_frames)
+                analysis_data = self.analyze_frames(frames, ocr=index)
+                self.record_frame_cost(time.monotonic() - analysis_start, analysis_data["frames_analyzed"])
+            else:
+                analysis_data = self.analyze_video_parallel(video_path, n_frames, workers, ocr=index)
+            if index:
+                save_index(video_path, analysis_data, n_frames)
         
         # Generate description
         description = self.generate_video_description(analysis_data)
@@ -243,22 +811,22 @@ class VideoCaptioningProcessor:
         elapsed_time = time.time() - start_time
         print(f"⏱️ Video captioning completed in {elapsed_time:.2f} seconds")
         
-        # Clean up temporary frame files (optional)
-        for frame_path in frame_paths:
-            try:
-                os.remove(frame_path)
-            except:
-                pass
-        
         return description, analysis_data
     
-    def record_and_caption_video(self, duration=10, camera_id=0):
+    def record_and_caption_video(self, duration=10, camera_id=0, n_frames=5, show_preview=True):
         """
         Record a video and generate a caption for it
         
+        Frames are sampled evenly over the recording and analyzed on a
+        background worker while recording goes on, so the caption is ready
+        right after the recording stops instead of after a second pass
+        over the saved file.
+        
         Args:
             duration (int): Duration to record in seconds
-            camera_id (int): Camera index to use
+            camera_id (int|str): Camera index, or a video file used as a stand-in device
+            n_frames (int): Number of frames to analyze
+            show_preview (bool): Show a preview window (False records headless)
             
         Returns:
             str: Path to saved video
@@ -267,16 +835,21 @@ class VideoCaptioningProcessor:
         # Create output directory if it doesn't exist
         os.makedirs("output/videos", exist_ok=True)
         
-        # Open camera
-        cap = cv2.VideoCapture(camera_id)
-        if not cap.isOpened():
+        # Open camera (frames are grabbed on a background thread)
+        try:
+            camera = CameraStream(camera_id).start()
+        except RuntimeError:
             print("❌ Error: Could not open camera.")
             return None, "Failed to open camera"
         
-        # Get camera properties
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        fps = 30
+        # Get camera properties; the first frame gives the real frame size
+        first = camera.read()
+        if first is None:
+            camera.stop()
+            print("❌ Error: Could not read from camera.")
+            return None, "Failed to read from camera"
+        height, width = first.image.shape[:2]
+        fps = camera.source_fps if 0 < camera.source_fps <= 60 else 30
         
         # Create output file
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -286,35 +859,60 @@ class VideoCaptioningProcessor:
         fourcc = cv2.VideoWriter_fourcc(*'avc1')  # H.264 codec
         out = cv2.VideoWriter(video_path, fourcc, fps, (width, height))
         
+        # Sampled frames go to a background analysis worker as they are recorded
+        sample_times = [(k + 0.5) * duration / n_frames for k in range(n_frames)]
+        samples = queue.Queue()
+        analyzer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="record-analysis")
+        analysis_future = analyzer.submit(self.analyze_frames, iter(samples.get, None))
+        
         print(f"🎥 Recording video for {duration} seconds...")
         
         # Record for specified duration
         start_time = time.time()
-        while time.time() - start_time < duration:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Write frame to video
-            out.write(frame)
-            
-            # Display recording status
-            cv2.putText(frame, f"Recording: {int(time.time() - start_time)}s / {duration}s", 
-                        (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-            cv2.imshow("Recording...", frame)
-            
-            # Check for ESC key to cancel
-            if cv2.waitKey(1) == 27:
-                break
-        
-        # Release resources
-        cap.release()
-        out.release()
-        cv2.destroyAllWindows()
+        last_index = None
+        try:
+            while time.time() - start_time < duration:
+                grabbed = camera.read(newer_than=last_index)
+                if grabbed is None:
+                    break
+                last_index = grabbed.index
+                frame = grabbed.image
+                elapsed = time.time() - start_time
+                
+                # Write frame to video
+                out.write(frame)
+                
+                if sample_times and elapsed >= sample_times[0]:
+                    sample_times.pop(0)
+                    samples.put(Frame(frame, elapsed, grabbed.index))
+                
+                if show_preview:
+                    # Display recording status (on a copy; the frame is shared with the camera buffer)
+                    preview = frame.copy()
+                    cv2.putText(preview, f"Recording: {int(elapsed)}s / {duration}s", 
+                                (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+                    cv2.imshow("Recording...", preview)
+                    
+                    # Check for ESC key to cancel
+                    if cv2.waitKey(1) == 27:
+                        break
+        finally:
+            # Release resources; the worker finishes the frames it already has
+            samples.put(None)
+            camera.stop()
+            out.release()
+            if show_preview:
+                cv2.destroyAllWindows()
         
         print(f"💾 Video saved to {video_path}")
         
-        # Caption the recorded video
-        caption, _ = self.caption_video(video_path)
+        # Caption the recorded video from the analysis done during recording
+        try:
+            analysis_data = analysis_future.result()
+        finally:
+            analyzer.shutdown()
+        if not analysis_data["scene_descriptions"]:
+            return video_path, "No frames were recorded"
+        caption = self.generate_video_description(analysis_data)
         
-        return video_path, caption
\ No newline at end of file
+        return video_path, caption
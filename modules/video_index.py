@@ -0,0 +1,198 @@
+import os
+from collections import Counter
+
+import numpy as np
+
+# Bumped whenever the stored columns change
+INDEX_VERSION = 2
+
+
+def index_path(video_path):
+    """Location of a video's analysis index (next to the video)"""
+    return f"{video_path}.index.npz"
+
+
+def save_index(video_path, analysis_data, n_frames=None, sampling="uniform", budget=None):
+    """
+    Store the per-frame results of analyze_frames as a columnar index
+
+    Frames are rows of equal-length arrays (timestamp, frame index,
+    caption, OCR text); detections are flattened into their own columns
+    with the row of the frame they belong to. Everything is plain numpy,
+    so loading needs no pickle.
+
+    Args:
+        video_path (str): Video the analysis belongs to
+        analysis_data (dict): Result of analyze_frames (or merge_analyses)
+        n_frames (int): Number of frames that was requested, for reuse checks
+        sampling (str): How the frames were chosen ('uniform' or 'budget'), for reuse checks
+        budget (float): Time budget of a 'budget' run, in seconds
+
+    Returns:
+        str: Path of the written index
+    """
+    descriptions = analysis_data["scene_descriptions"]
+    count = len(descriptions)
+    timestamps = [np.nan if t is None else t for t in analysis_data.get("timestamps") or [None] * count]
+    indices = [-1 if i is None else i for i in analysis_data.get("frame_indices") or [None] * count]
+    texts = [t or "" for t in analysis_data.get("frame_text") or [None] * count]
+    representatives = analysis_data.get("representative_frames") or list(range(count))
+    detections = analysis_data.get("frame_detections") or [[]] * count
+
+    det_frame, det_label, det_bbox, det_confidence = [], [], [], []
+    for row, frame_detections in enumerate(detections):
+        for d in frame_detections:
+            det_frame.append(row)
+            det_label.append(d["label"])
+            det_bbox.append(d["bbox"])
+            det_confidence.append(d.get("confidence", 1.0))
+
+    path = index_path(video_path)
+    with open(path, "wb") as f:
+        np.savez_compressed(
+            f,
+            version=np.int32(INDEX_VERSION),
+            video_mtime=np.float64(os.path.getmtime(video_path)),
+            n_frames=np.int32(n_frames if n_frames is not None else count),
+            sampling=np.array(sampling),
+            budget=np.float64(np.nan if budget is None else budget),
+            timestamp=np.array(timestamps, dtype=np.float64),
+            frame_index=np.array(indices, dtype=np.int64),
+            caption=np.array(descriptions, dtype=str),
+            ocr_text=np.array(texts, dtype=str),
+            representative=np.array(representatives, dtype=np.int32),
+            det_frame=np.array(det_frame, dtype=np.int32),
+            det_label=np.array(det_label, dtype=str),
+            det_bbox=np.array(det_bbox, dtype=np.int32).reshape(-1, 4),
+            det_confidence=np.array(det_confidence, dtype=np.float32),
+        )
+    print(f"🗂️ Video index saved to {path}")
+    return path
+
+
+class VideoIndex:
+    def __init__(self, columns):
+        """
+        Query the stored per-frame analysis of a video without running any model
+
+        Use VideoIndex.load(video_path) to open the index next to a video.
+        """
+        self.columns = columns
+        self.timestamp = columns["timestamp"]
+        self.frame_index = columns["frame_index"]
+        self.caption = columns["caption"]
+        self.ocr_text = columns["ocr_text"]
+        self.det_frame = columns["det_frame"]
+        self.det_label = columns["det_label"]
+        self.det_bbox = columns["det_bbox"]
+        self.det_confidence = columns["det_confidence"]
+
+    @classmethod
+    def load(cls, video_path):
+        """
+        Open a video's index
+
+        Returns:
+            VideoIndex: The index, or None if there is none or it is older than the video
+        """
+        path = index_path(video_path)
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            columns = {name: data[name] for name in data.files}
+        if int(columns["version"]) != INDEX_VERSION:
+            return None
+        if os.path.exists(video_path) and os.path.getmtime(video_path) > float(columns["video_mtime"]):
+            return None
+        return cls(columns)
+
+    @property
+    def n_frames(self):
+        return int(self.columns["n_frames"])
+
+    @property
+    def sampling(self):
+        return str(self.columns["sampling"])
+
+    @property
+    def budget(self):
+        budget = float(self.columns["budget"])
+        return None if np.isnan(budget) else budget
+
+    def matches(self, n_frames=None, budget=None):
+        """
+        Whether this index can stand in for a new analysis run
+
+        A plain run needs the same number of uniformly sampled frames; a
+        budget run needs an index from a budget run with at least that budget.
+        """
+        if budget is None:
+            return self.sampling == "uniform" and self.n_frames == n_frames
+        return self.sampling == "budget" and self.budget is not None and self.budget >= budget
+
+    def _rows(self, rows):
+        return [
+            {
+                "timestamp": None if np.isnan(self.timestamp[r]) else float(self.timestamp[r]),
+                "frame_index": int(self.frame_index[r]),
+                "caption": str(self.caption[r]),
+                "text": str(self.ocr_text[r]),
+            }
+            for r in rows
+        ]
+
+    def frames_with_label(self, label, min_confidence=0.0):
+        """Frames in which an object class was detected"""
+        hits = (self.det_label == label) & (self.det_confidence >= min_confidence)
+        return self._rows(np.unique(self.det_frame[hits]))
+
+    def when(self, label, min_confidence=0.0):
+        """
+        Time spans in which an object class is visible
+
+        Consecutive sampled frames containing the label form one span.
+
+        Returns:
+            list: (start, end) timestamps in seconds
+        """
+        hits = (self.det_label == label) & (self.det_confidence >= min_confidence)
+        rows = np.unique(self.det_frame[hits])
+        if len(rows) == 0:
+            return []
+        breaks = np.flatnonzero(np.diff(rows) > 1) + 1
+        return [
+            (float(self.timestamp[run[0]]), float(self.timestamp[run[-1]]))
+            for run in np.split(rows, breaks)
+        ]
+
+    def frames_with_text(self, text):
+        """Frames whose OCR text contains text (case-insensitive)"""
+        found = np.char.find(np.char.lower(self.ocr_text), text.lower()) >= 0
+        return self._rows(np.flatnonzero(found))
+
+    def frames_with_caption(self, words):
+        """Frames whose caption contains all of the given words (case-insensitive)"""
+        captions = np.char.lower(self.caption)
+        found = np.ones(len(captions), dtype=bool)
+        for word in words.lower().split():
+            found &= np.char.find(captions, word) >= 0
+        return self._rows(np.flatnonzero(found))
+
+    def to_analysis(self):
+        """Rebuild the analysis data of the indexed frames (for generate_video_description)"""
+        detections = [[] for _ in range(len(self.caption))]
+        for row, label, bbox, confidence in zip(self.det_frame, self.det_label, self.det_bbox, self.det_confidence):
+            detections[row].append({
+                "label": str(label),
+                "bbox": [int(v) for v in bbox],
+                "confidence": round(float(confidence), 2),
+            })
+        return {
+            "scene_descriptions": [str(c) for c in self.caption],
+            "detection_counts": dict(Counter(str(label) for label in self.det_label)),
+            "representative_frames": [int(r) for r in self.columns["representative"]],
+            "timestamps": [row["timestamp"] for row in self._rows(range(len(self.caption)))],
+            "frame_indices": [int(i) for i in self.frame_index],
+            "frame_detections": detections,
+            "frame_text": [str(t) or None for t in self.ocr_text],
+        }
@@ -1,21 +1,39 @@
+import threading
+
 from transformers import BlipProcessor, BlipForConditionalGeneration
-from PIL import Image
 import torch
 
+from modules.image_io import load_image
+from modules.shared_weights import load_pretrained
+
 device = "cuda" if torch.cuda.is_available() else "cpu"
 
+MODEL_NAME = "Salesforce/blip-image-captioning-base"
+
+# Loaded on first use, so importing this module (e.g. in a worker process) costs no model memory
+_blip = None
+_blip_lock = threading.Lock()
+
 
-blip_processor = BlipProcessor.from_pretrained("Salesforce/blip-image-captioning-base")
-blip_model = BlipForConditionalGeneration.from_pretrained("Salesforce/blip-image-captioning-base")
+def get_blip():
+    """Return the BLIP captioning processor and model, loading them on first use"""
+    global _blip
+    with _blip_lock:
+        if _blip is None:
+            _blip = (BlipProcessor.from_pretrained(MODEL_NAME),
+                     load_pretrained(BlipForConditionalGeneration, MODEL_NAME))
+        return _blip
 
 def describe_scene(image_path):
-    image = Image.open(image_path).convert("RGB")
+    blip_processor, blip_model = get_blip()
+    image = load_image(image_path)
     inputs = blip_processor(images=image, return_tensors="pt")
     out = blip_model.generate(**inputs)
     return blip_processor.decode(out[0], skip_special_tokens=True)
     
 def answer_query(image_path, question):
-    image = Image.open(image_path).convert("RGB")
+    blip_processor, blip_model = get_blip()
+    image = load_image(image_path)
     inputs = blip_processor(images=image, text=question, return_tensors="pt").to(device)
     output = blip_model.generate(**inputs, max_new_tokens=50)
     answer = blip_processor.decode(output[0], skip_special_tokens=True)
@@ -1,12 +1,216 @@
+import hashlib
+import os
+import re
+import threading
+import time
 import torch
+import numpy as np
 from PIL import Image
 from transformers import BlipProcessor, BlipForQuestionAnswering
 import warnings
+from collections import Counter, OrderedDict
 warnings.filterwarnings("ignore")
 
+from modules.image_io import load_image, image_size
+from modules.frame_signatures import dhash
+from modules.shared_weights import load_pretrained
+
 # Constants
 MODEL_NAME = "Salesforce/blip-vqa-base"  # Smaller efficient model for edge devices
 
+# Question intents that can be answered without the VQA model (regular
+# expressions, matched on word boundaries)
+COUNT_PATTERNS = (r"how many", r"count the", r"number of")
+LOCATION_PATTERNS = (r"where is", r"where are", r"where's", r"which side", r"on the left", r"on the right",
+                     r"in the center", r"in the middle")
+TEXT_PATTERNS = (r"what does (it|this|that) say", r"what( is|'s) written", r"read (it|this|that|the)",
+                 r"text", r"(sign|label|note|screen|board|poster|menu|page|document|card)s? says?",
+                 r"what does (the|this|that) (sign|label|note|screen|board|poster|menu|page|document|card) say")
+
+# Answer cache: entries kept, seconds an answer stays valid, and whether
+# near-identical images (same perceptual hash) share answers
+ANSWER_CACHE_SIZE = int(os.environ.get("VISION_VQA_CACHE_SIZE", 256))
+ANSWER_CACHE_TTL = float(os.environ.get("VISION_VQA_CACHE_TTL", 600))
+ANSWER_CACHE_PERCEPTUAL = os.environ.get("VISION_VQA_CACHE_PERCEPTUAL", "0") == "1"
+
+# Plural forms that don't just add an "s"
+IRREGULAR_PLURALS = {"person": "people", "mouse": "mice", "knife": "knives", "sheep": "sheep"}
+
+
+def _matches(patterns, query):
+    return any(re.search(rf"\b{pattern}\b", query) for pattern in patterns)
+
+
+def classify_query(query):
+    """
+    Route a question to the cheapest stage that can answer it
+
+    Returns:
+        str: "count" and "location" (answered from detections), "text"
+        (answered by OCR) or "open" (needs the VQA model)
+    """
+    query = query.lower()
+    if _matches(TEXT_PATTERNS, query):
+        return "text"
+    if _matches(COUNT_PATTERNS, query):
+        return "count"
+    if _matches(LOCATION_PATTERNS, query):
+        return "location"
+    return "open"
+
+
+def _plural(label):
+    if label in IRREGULAR_PLURALS:
+        return IRREGULAR_PLURALS[label]
+    return label + ("es" if label.endswith(("s", "sh", "ch")) else "s")
+
+
+def mentioned_labels(query, labels):
+    """Detector classes named in a question (singular or plural), longest names first"""
+    query = f" {query.lower()} "
+    found = []
+    for label in sorted(labels, key=len, reverse=True):
+        for form in (label, _plural(label)):
+            if f" {form} " in query or f" {form}?" in query or f" {form}'" in query:
+                # "cell phone" shouldn't also count as "phone"
+                if not any(label in longer for longer in found):
+                    found.append(label)
+                break
+    return found
+
+
+def text_answer(text):
+    """Answer to a text question from the OCR result"""
+    return f"The text says: {text}" if text else "I can't find any readable text."
+
+
+def _region(bbox, width):
+    cx = (bbox[0] + bbox[2]) / 2
+    if cx < width / 3:
+        return "left"
+    if cx > 2 * width / 3:
+        return "right"
+    return "center"
+
+
+def _place(region):
+    return "in the center" if region == "center" else f"on the {region}"
+
+
+def answer_from_detections(query, detections, image_width, labels):
+    """
+    Answer count and location questions from object detections alone
+
+    Args:
+        query (str): The user's question
+        detections (list): Detections with "label" and "bbox"
+        image_width (int): Width of the image, for left/center/right
+        labels (set): Every class the detector knows
+
+    Returns:
+        str: The answer, or None if the question is about something the
+        detector can't see (the VQA model has to answer it)
+    """
+    query_lower = query.lower()
+    intent = classify_query(query)
+    named = mentioned_labels(query_lower, labels)
+    counts = Counter(d["label"] for d in detections)
+
+    if intent == "count":
+        if named:
+            if not any(counts[label] for label in named):
+                return f"I don't see any {' or '.join(_plural(label) for label in named)}."
+            parts = [f"{counts[label]} {label if counts[label] == 1 else _plural(label)}" for label in named]
+            return f"I see {', '.join(parts)}."
+        if any(word in query_lower for word in ("object", "thing", "item")):
+            return f"There are {sum(counts.values())} objects in the image."
+        return None
+
+    if intent == "location":
+        if named:
+            sentences = []
+            for label in named:
+                regions = Counter(_region(d["bbox"], image_width) for d in detections if d["label"] == label)
+                if not regions:
+                    sentences.append(f"I don't see any {_plural(label)}.")
+                else:
+                    places = " and ".join(_place(region) for region in regions)
+                    sentences.append(f"The {label if sum(regions.values()) == 1 else _plural(label)} "
+                                     f"{'is' if sum(regions.values()) == 1 else 'are'} {places}.")
+            return " ".join(sentences)
+        for region, words in (("left", ("left",)), ("right", ("right",)), ("center", ("center", "middle"))):
+            if any(word in query_lower for word in words):
+                here = Counter(d["label"] for d in detections if _region(d["bbox"], image_width) == region)
+                if not here:
+                    return f"I don't see anything {_place(region)}."
+                things = ", ".join(f"{count} {label if count == 1 else _plural(label)}" for label, count in here.items())
+                return f"{_place(region).capitalize()}, there is {things}."
+        return None
+
+    return None
+
+
+def normalize_question(question):
+    """Lowercase, single-spaced question without trailing punctuation"""
+    return re.sub(r"\s+", " ", question.lower()).strip().rstrip("?.! ")
+
+
+class AnswerCache:
+    """LRU cache of VQA answers keyed by image content and question, with expiry"""
+
+    def __init__(self, max_entries=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL, perceptual=ANSWER_CACHE_PERCEPTUAL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.perceptual = perceptual
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def image_key(self, image):
+        """Content hash of an RGB PIL image (perceptual if enabled, so re-encoded or re-captured frames match)"""
+        if self.perceptual:
+            gray = np.asarray(image.convert("L"))
+            return "p:" + dhash(gray, hash_size=16).tobytes().hex()
+        digest = hashlib.blake2b(image.tobytes(), digest_size=16)
+        digest.update(repr(image.size).encode())
+        return "x:" + digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+            answer, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return answer
+
+    def put(self, key, answer):
+        with self._lock:
+            self._items[key] = (answer, time.monotonic())
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache():
+    """Return the process-wide VQA answer cache (shared by the CLI, GUI and server)"""
+    global _answer_cache
+    with _answer_cache_lock:
+        if _answer_cache is None:
+            _answer_cache = AnswerCache()
+        return _answer_cache
+
+
 class VQAProcessor:
     def __init__(self):
         """Initialize the Visual Question Answering model"""
@@ -15,7 +219,7 @@ class VQAProcessor:
         
         # Load BLIP VQA model
         self.processor = BlipProcessor.from_pretrained(MODEL_NAME)
-        self.model = BlipForQuestionAnswering.from_pretrained(MODEL_NAME).to(self.device)
+        self.model = load_pretrained(BlipForQuestionAnswering, MODEL_NAME).to(self.device)
         
         # Optimize the model for inference
         self.model.eval()  # Set to evaluation mode
@@ -30,7 +234,7 @@ class VQAProcessor:
         Answer a natural language question about an image
         
         Args:
-            image_path (str): Path to the image
+            image_path (str|PIL.Image|numpy.ndarray): Image path or in-memory image
             question (str): Question about the image
             
         Returns:
@@ -39,7 +243,15 @@ class VQAProcessor:
         print(f"❓ Processing question: '{question}'")
         
         # Load and process the image
-        image = Image.open(image_path).convert('RGB')
+        image = load_image(image_path)
+        
+        # Same image, same question: skip the model
+        cache = get_answer_cache()
+        key = (cache.image_key(image), normalize_question(question))
+        answer = cache.get(key)
+        if answer is not None:
+            print(f"💡 Answer (cached): '{answer}'")
+            return answer
         
         # Preprocess the inputs
         inputs = self.processor(image, question, return_tensors="pt").to(self.device)
@@ -49,6 +261,7 @@ class VQAProcessor:
             outputs = self.model.generate(**inputs)
             answer = self.processor.decode(outputs[0], skip_special_tokens=True)
         
+        cache.put(key, answer)
         print(f"💡 Answer: '{answer}'")
         return answer
     
@@ -88,7 +301,11 @@ class VQAProcessor:
 
     def answer_query_with_context(self, image_path, query, image_data=None):
         """
-        Answer a query using both VQA and existing image analysis data
+        Answer a query using existing image analysis data where possible
+        
+        Count and location questions are answered from the detections and
+        text questions from the OCR result in image_data; only the rest
+        (or questions about things the detector doesn't know) run VQA.
         
         Args:
             image_path (str): Path to the image
@@ -98,41 +315,17 @@ class VQAProcessor:
         Returns:
             str: Natural language answer
         """
-        # First try answering directly with VQA
-        enhanced_query = self.parse_and_enhance_query(query, image_data)
-        answer = self.answer_question(image_path, enhanced_query)
+        intent = classify_query(query)
         
-        # If we have image data and a simple/short answer, try to enhance it
-        if image_data and len(answer.split()) < 4:
-            query_lower = query.lower()
-            
-            # Handle count questions by using detector data
-            if "how many" in query_lower:
-                obj_type = query_lower.replace("how many", "").strip().rstrip("?").strip()
-                if "object" in obj_type or "thing" in obj_type:
-                    count = sum(image_data.get("objects_detected", {}).values())
-                    return f"There are {count} objects in the image."
-                
-                # Check for specific object type
-                for obj, count in image_data.get("objects_detected", {}).items():
-                    if obj in obj_type or obj_type in obj:
-                        return f"There are {count} {obj}(s) in the image."
-            
-            # Handle location questions
-            elif "where" in query_lower:
-                for obj in image_data.get("objects_detected", {}):
-                    if obj in query_lower:
-                        # Find the region with this object
-                        for region in image_data.get("regions", []):
-                            if obj in region:
-                                return f"The {obj} is {region}."
-            
-            # Try to handle "what's on the left/right/etc."
-            directions = ["left", "right", "center", "top", "bottom"]
-            for direction in directions:
-                if direction in query_lower:
-                    for region in image_data.get("regions", []):
-                        if direction in region:
-                            return f"On the {direction}, there is {region}."
-        
-        return answer
\ No newline at end of file
+        if image_data and intent in ("count", "location") and "detections" in image_data:
+            width = image_size(image_path)[0]
+            answer = answer_from_detections(query, image_data["detections"], width,
+                                            set(image_data.get("known_labels") or image_data["objects_detected"]))
+            if answer is not None:
+                return answer
+        
+        if image_data and intent == "text" and "ocr_lines" in image_data:
+            return text_answer(image_data["ocr_text"] if image_data["ocr_lines"] else "")
+        
+        enhanced_query = self.parse_and_enhance_query(query, image_data)
+        return self.answer_question(image_path, enhanced_query)
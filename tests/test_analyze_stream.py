@@ -0,0 +1,71 @@
+import io
+import json
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("ultralytics")
+
+from PIL import Image
+
+import app as app_module
+import main
+
+
+def _events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def _post(client):
+    image = io.BytesIO()
+    Image.new("RGB", (64, 48), "white").save(image, format="JPEG")
+    image.seek(0)
+    return client.post("/analyze/stream", data={"image": (image, "image.jpg")},
+                       content_type="multipart/form-data")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "describe_scene", lambda image: "a white wall")
+    monkeypatch.setattr(main, "detect_objects", lambda image: [])
+    monkeypatch.setattr(main, "read_text_lines", lambda image: {"text": "", "lines": [], "text_gate": {"text_likely": False, "score": 0, "threshold": 1}})
+    return app_module.app.test_client()
+
+
+def test_all_stages_then_final(client):
+    events = _events(_post(client).get_data(as_text=True))
+    assert sorted(name for name, _ in events[:-1]) == ["caption", "detection", "ocr"]
+    name, final = events[-1]
+    assert name == "final"
+    assert final["scene_description"] == "a white wall"
+
+
+def test_failed_stage_sends_error_then_partial_final(client, monkeypatch):
+    def broken(image):
+        raise RuntimeError("model crashed")
+
+    monkeypatch.setattr(main, "read_text_lines", broken)
+    events = _events(_post(client).get_data(as_text=True))
+    names = [name for name, _ in events]
+
+    assert "error" in names and "ocr" not in names
+    assert {"caption", "detection"} <= set(names)
+    error = dict(events)["error"]
+    assert error["stage"] == "ocr" and "model crashed" in error["error"]
+
+    name, final = events[-1]
+    assert name == "final"
+    assert final["completed"]["caption"] == "a white wall"
+    assert set(final["errors"]) == {"ocr"}
+
+
+def test_stages_get_the_uploaded_image_in_memory(client, monkeypatch):
+    received = []
+    monkeypatch.setattr(main, "describe_scene", lambda image: received.append(image) or "a white wall")
+    _post(client).get_data()
+    assert len(received) == 1 and isinstance(received[0], Image.Image)
+    assert received[0].size == (64, 48)
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+av = pytest.importorskip("av")
+cv2 = pytest.importorskip("cv2")
+
+from modules.iframe_index import iter_iframes, keyframe_index
+
+FPS = 25
+GOP = 25
+FRAMES = 300
+
+
+def _scene(i):
+    # A new flat color every GOP, so each I-frame starts a different "shot"
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+    frame[:] = ((i // GOP) * 40 % 256, (i // GOP) * 90 % 256, 255 - (i // GOP) * 20 % 256)
+    cv2.putText(frame, str(i), (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+    return frame
+
+
+@pytest.fixture(scope="module")
+def mp4(tmp_path_factory):
+    """H.264 MP4 with an I-frame exactly every GOP frames"""
+    path = str(tmp_path_factory.mktemp("video") / "gop.mp4")
+    container = av.open(path, "w")
+    stream = container.add_stream("libx264", rate=FPS)
+    stream.width, stream.height, stream.pix_fmt = 160, 120, "yuv420p"
+    stream.codec_context.gop_size = GOP
+    stream.codec_context.options = {"sc_threshold": "0", "keyint_min": str(GOP)}
+    for i in range(FRAMES):
+        for packet in stream.encode(av.VideoFrame.from_ndarray(_scene(i), format="bgr24")):
+            container.mux(packet)
+    for packet in stream.encode():
+        container.mux(packet)
+    container.close()
+    return path
+
+
+@pytest.fixture(scope="module")
+def avi(tmp_path_factory):
+    """MJPEG AVI: every frame is a keyframe, and the container has no seek index to walk"""
+    path = str(tmp_path_factory.mktemp("video") / "mjpg.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), FPS, (160, 120))
+    for i in range(50):
+        writer.write(_scene(i))
+    writer.release()
+    return path
+
+
+def test_keyframe_index_mp4(mp4):
+    keyframes = keyframe_index(mp4)
+    assert [seconds for _, seconds in keyframes] == pytest.approx([i * GOP / FPS for i in range(FRAMES // GOP)])
+    assert [pts for pts, _ in keyframes] == sorted(pts for pts, _ in keyframes)
+
+
+def test_keyframe_index_without_seek_index(avi):
+    keyframes = keyframe_index(avi)
+    assert len(keyframes) == 50
+    assert [seconds for _, seconds in keyframes] == pytest.approx([i / FPS for i in range(50)])
+
+
+def test_iter_iframes_yields_only_iframes(mp4):
+    frames = list(iter_iframes(mp4, n_frames=4))
+    assert 0 < len(frames) <= 4
+    indices = [index for index, _, _ in frames]
+    assert indices == sorted(indices)
+    for index, seconds, image in frames:
+        assert index % GOP == 0
+        assert index == round(seconds * FPS)
+        assert image.shape == (120, 160, 3)
+
+
+def test_iter_iframes_returns_all_when_few(mp4):
+    frames = list(iter_iframes(mp4, n_frames=FRAMES // GOP + 5, max_side=80))
+    assert [index for index, _, _ in frames] == [i * GOP for i in range(FRAMES // GOP)]
+    assert max(frames[0][2].shape[:2]) == 80
@@ -0,0 +1,131 @@
+import json
+import multiprocessing
+import os
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("fcntl")
+
+from modules import shared_weights
+
+
+class TinyModel(torch.nn.Module):
+    def __init__(self, hidden=8):
+        super().__init__()
+        self.embed = torch.nn.Embedding(10, hidden)
+        self.body = torch.nn.Linear(hidden, hidden)
+        self.head = torch.nn.Linear(hidden, 10, bias=False)
+        self.head.weight = self.embed.weight  # tied, like most language model heads
+        self.register_buffer("scale", torch.tensor(2.0), persistent=False)
+
+    def forward(self, tokens):
+        return self.head(self.body(self.embed(tokens)) * self.scale)
+
+
+def _trained(seed=0, hidden=8):
+    torch.manual_seed(seed)
+    return TinyModel(hidden).eval()
+
+
+def _skeleton(hidden=8):
+    with torch.device("meta"):
+        return TinyModel(hidden)
+
+
+TOKENS = torch.tensor([1, 2, 3])
+
+
+@pytest.fixture
+def shm(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_weights, "SHARED_WEIGHTS_ENABLED", True)
+    monkeypatch.setattr(shared_weights, "SHARED_WEIGHTS_DIR", str(tmp_path))
+    monkeypatch.setattr(shared_weights, "_attached", set())
+    return tmp_path
+
+
+def _child_output(queue):
+    model = shared_weights.load_shared("tiny", lambda: pytest.fail("child must not load"), _skeleton)
+    with torch.no_grad():
+        queue.put(model(TOKENS).tolist())
+
+
+def test_publish_then_attach(shm):
+    expected = _trained()(TOKENS)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return _trained()
+
+    first = shared_weights.load_shared("tiny", load, _skeleton)
+    assert loads == [1]
+    assert torch.allclose(first(TOKENS), expected)
+    # The first process also runs on the shared copy; tied weights stay tied
+    assert first.head.weight.data_ptr() == first.embed.weight.data_ptr()
+
+    shared_weights._attached.clear()  # as if this were another process
+    second = shared_weights.load_shared("tiny", load, _skeleton)
+    assert loads == [1]
+    assert torch.allclose(second(TOKENS), expected)
+    assert second.scale.item() == 2.0
+
+
+def test_other_process_attaches(shm):
+    expected = _trained()(TOKENS)
+    shared_weights.load_shared("tiny", _trained, _skeleton)
+    queue = multiprocessing.get_context("fork").Queue()
+    child = multiprocessing.get_context("fork").Process(target=_child_output, args=(queue,))
+    child.start()
+    output = queue.get(timeout=30)
+    child.join()
+    assert torch.allclose(torch.tensor(output), expected)
+
+
+def test_stale_copy_is_republished(shm):
+    shared_weights.load_shared("tiny", lambda: _trained(hidden=4), lambda: _skeleton(hidden=4))
+    shared_weights._attached.clear()
+
+    # Same key, other architecture (e.g. after an upgrade): the old copy must not be used
+    model = shared_weights.load_shared("tiny", lambda: _trained(hidden=8), lambda: _skeleton(hidden=8))
+    assert not any(t.is_meta for t in model.parameters())
+    assert torch.allclose(model(TOKENS), _trained(hidden=8)(TOKENS))
+
+
+def test_other_fingerprint_is_republished(shm):
+    shared_weights.load_shared("tiny", lambda: _trained(seed=0), _skeleton, fingerprint="v1")
+    shared_weights._attached.clear()
+    model = shared_weights.load_shared("tiny", lambda: _trained(seed=1), _skeleton, fingerprint="v2")
+    assert torch.allclose(model(TOKENS), _trained(seed=1)(TOKENS))
+    with open(shm / "tiny.json") as f:
+        assert json.load(f)["fingerprint"] == "v2"
+    # Only the current copy is left in shared memory
+    assert len([name for name in os.listdir(shm) if name.endswith(".bin")]) == 1
+
+
+def test_incomplete_copy_is_republished(shm):
+    shared_weights.load_shared("tiny", _trained, _skeleton)
+    shared_weights._attached.clear()
+    manifest_path = shm / "tiny.json"
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    manifest["tensors"] = [e for e in manifest["tensors"] if e["name"] != "body.bias"]
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+
+    model = shared_weights.load_shared("tiny", _trained, _skeleton)
+    assert not any(t.is_meta for t in model.parameters())
+    assert torch.allclose(model(TOKENS), _trained()(TOKENS))
+
+
+def test_last_release_removes_copy(shm):
+    shared_weights.load_shared("tiny", _trained, _skeleton)
+    assert any(name.endswith(".bin") for name in os.listdir(shm))
+    shared_weights.release("tiny")
+    assert sorted(os.listdir(shm)) == ["tiny.lock"]
+
+
+def test_disabled_is_plain_load(shm, monkeypatch):
+    monkeypatch.setattr(shared_weights, "SHARED_WEIGHTS_ENABLED", False)
+    shared_weights.load_shared("tiny", _trained, _skeleton)
+    assert os.listdir(shm) == []
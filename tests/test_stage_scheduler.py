@@ -0,0 +1,34 @@
+import threading
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from modules.stage_scheduler import StageScheduler
+
+
+def test_concurrent_stages_keep_their_thread_budgets():
+    layout = {
+        "interop_threads": None,
+        "stages": {
+            "caption": {"threads": 4},
+            "detection": {"threads": 1},
+            "ocr": {"threads": 2},
+        },
+    }
+    scheduler = StageScheduler(layout)
+    # Hold every worker until all have started, like iter_pipeline_stages does
+    barrier = threading.Barrier(len(layout["stages"]))
+
+    def num_threads():
+        barrier.wait(timeout=10)
+        torch.ones(1).add_(1)
+        return torch.get_num_threads()
+
+    try:
+        futures = {name: scheduler.submit(name, num_threads) for name in layout["stages"]}
+        threads = {name: future.result(timeout=30) for name, future in futures.items()}
+    finally:
+        scheduler.shutdown()
+
+    assert threads == {"caption": 4, "detection": 1, "ocr": 2}
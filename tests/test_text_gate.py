@@ -0,0 +1,66 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pytest.importorskip("transformers")
+cv2 = pytest.importorskip("cv2")
+from PIL import Image
+
+from modules import ocr_reader
+from modules.ocr_reader import TEXT_GATE_THRESHOLD, read_text_lines, text_presence_score
+
+SAMPLES = Path(__file__).resolve().parent.parent / "sample_inputs"
+
+
+def _scene(seed=0):
+    # Smooth background with random filled shapes: edges, but no text lines
+    rng = np.random.default_rng(seed)
+    ramp = np.linspace(40, 200, 640, dtype=np.uint8)
+    image = np.dstack([np.tile(ramp, (480, 1))] * 3).copy()
+    for _ in range(12):
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        center = tuple(int(c) for c in rng.integers(0, 480, 2))
+        if rng.random() < 0.5:
+            cv2.circle(image, center, int(rng.integers(10, 80)), color, -1)
+        else:
+            corner = (center[0] + int(rng.integers(20, 150)), center[1] + int(rng.integers(20, 150)))
+            cv2.rectangle(image, center, corner, color, -1)
+    return Image.fromarray(image)
+
+
+def _printed(lines):
+    image = np.full((480, 640, 3), 255, np.uint8)
+    for i, line in enumerate(lines):
+        cv2.putText(image, line, (20, 60 + 50 * i), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 0), 2)
+    return Image.fromarray(image)
+
+
+@pytest.mark.parametrize("name", ["ocrp.jpg", "finalocr.jpeg"])
+def test_sample_text_images_pass(name):
+    image = Image.open(SAMPLES / name).convert("RGB")
+    assert text_presence_score(image) >= TEXT_GATE_THRESHOLD
+
+
+def test_printed_lines_pass():
+    assert text_presence_score(_printed(["penguins are cute", "except one"])) >= TEXT_GATE_THRESHOLD
+
+
+@pytest.mark.parametrize("image", [
+    Image.new("RGB", (640, 480), (90, 90, 90)),
+    Image.fromarray(np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)),
+    _scene(0),
+    _scene(1),
+])
+def test_text_free_images_skip(image):
+    assert text_presence_score(image) < TEXT_GATE_THRESHOLD
+
+
+def test_gate_skips_models(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("OCR ran on a text-free image")
+    monkeypatch.setattr(ocr_reader, "detect_text_boxes", fail)
+
+    result = read_text_lines(_scene(0))
+    assert result["lines"] == []
+    assert result["text_gate"]["text_likely"] is False
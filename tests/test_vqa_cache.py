@@ -0,0 +1,66 @@
+import pytest
+
+pytest.importorskip("transformers")
+
+import torch
+from PIL import Image
+
+from modules.vqa_module import VQAProcessor, get_answer_cache
+
+
+class _Inputs(dict):
+    def to(self, device):
+        return self
+
+
+class _EchoProcessor:
+    """Stands in for the BLIP processor; the 'answer' is the question the model got"""
+
+    def __init__(self):
+        self.questions = []
+
+    def __call__(self, image, question, return_tensors=None):
+        self.questions.append(question)
+        return _Inputs(question=question)
+
+    def decode(self, output, skip_special_tokens=True):
+        return output
+
+
+class _EchoModel:
+    def generate(self, question):
+        return [f"answer to {question}"]
+
+
+@pytest.fixture
+def vqa():
+    processor = VQAProcessor.__new__(VQAProcessor)
+    processor.device = torch.device("cpu")
+    processor.processor = _EchoProcessor()
+    processor.model = _EchoModel()
+    get_answer_cache().clear()
+    yield processor
+    get_answer_cache().clear()
+
+
+def test_repeated_question_is_cached(vqa):
+    image = Image.new("RGB", (32, 32), "red")
+    first = vqa.answer_question(image, "What color is it?")
+    assert vqa.answer_question(image, "what color is it") == first
+    assert len(vqa.processor.questions) == 1
+
+
+def test_key_is_the_question_sent_to_the_model(vqa):
+    image = Image.new("RGB", (32, 32), "red")
+    # Both questions start with a pattern parse_and_enhance_query rewrites,
+    # but answer_question gets them as they are
+    broad = vqa.answer_question(image, "what is in the background?")
+    specific = vqa.answer_question(image, "what is in the background behind the bus?")
+    assert broad != specific
+    assert len(vqa.processor.questions) == 2
+
+
+def test_different_images_are_not_shared(vqa):
+    vqa.answer_question(Image.new("RGB", (32, 32), "red"), "what is this?")
+    vqa.answer_question(Image.new("RGB", (32, 32), "blue"), "what is this?")
+    assert len(vqa.processor.questions) == 2
@@ -0,0 +1,53 @@
+import pytest
+
+pytest.importorskip("transformers")
+
+from modules.vqa_module import answer_from_detections, classify_query, normalize_question
+
+
+@pytest.mark.parametrize("query", [
+    "What does it say?",
+    "what does the sign say",
+    "Read the label for me",
+    "what's written on the board?",
+    "Is there any text here?",
+    "what do the signs say",
+])
+def test_text_questions(query):
+    assert classify_query(query) == "text"
+
+
+@pytest.mark.parametrize("query", [
+    "what does the dog look like?",
+    "what does the man hold?",
+    "what is the context of this scene?",
+    "describe the texture of the wall",
+    "what is the man reading?",
+])
+def test_not_text_questions(query):
+    assert classify_query(query) == "open"
+
+
+@pytest.mark.parametrize("query, intent", [
+    ("How many people are there?", "count"),
+    ("count the cars", "count"),
+    ("where is the bus?", "location"),
+    ("what is on the left?", "location"),
+    ("somewhere isn't here", "open"),
+])
+def test_count_and_location_questions(query, intent):
+    assert classify_query(query) == intent
+
+
+def test_count_from_detections():
+    detections = [
+        {"label": "person", "bbox": [0, 0, 10, 10]},
+        {"label": "person", "bbox": [200, 0, 210, 10]},
+    ]
+    answer = answer_from_detections("How many people?", detections, 300, {"person", "car"})
+    assert answer == "I see 2 people."
+    assert answer_from_detections("how many cars?", detections, 300, {"person", "car"}) == "I don't see any cars."
+
+
+def test_normalize_question():
+    assert normalize_question("  What IS  this?? ") == "what is this"